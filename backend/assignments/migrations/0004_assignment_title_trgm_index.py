@@ -0,0 +1,20 @@
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assignments', '0003_assignment_module'),
+        # Creates the pg_trgm extension
+        ('users', '0003_user_email_trgm_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='assignment',
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=['title'], name='assignments_title_trgm_idx', opclasses=['gin_trgm_ops'],
+            ),
+        ),
+    ]
@@ -1,4 +1,5 @@
 import uuid
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 
 
@@ -105,6 +106,10 @@ class Assignment(models.Model):
     class Meta:
         db_table = 'assignments'
         ordering = ['order', 'created_at']
+        indexes = [
+            # Trigram index so admin searches (ILIKE '%term%') avoid a full scan
+            GinIndex(fields=['title'], name='assignments_title_trgm_idx', opclasses=['gin_trgm_ops']),
+        ]
 
     def __str__(self):
         return f'{self.title} ({self.course.title})'
@@ -88,9 +88,29 @@ DATABASES = {
     }
 }
 
+# Cache shared by all workers (rate limit counters, cached payloads).
+# Without a Redis URL each process falls back to its own memory cache.
+CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', '')
+if CACHE_REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+        }
+    }
+
 # Custom User Model
 AUTH_USER_MODEL = 'users.User'
 
+# Password hashing: Argon2id first; the others verify existing hashes,
+# which are upgraded to Argon2 on the next successful login
+PASSWORD_HASHERS = [
+    'config.hashers.TunedArgon2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -135,10 +155,10 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 20,
     # In production only return JSON. The browsable HTML UI is dev-only.
     'DEFAULT_RENDERER_CLASSES': (
-        ('rest_framework.renderers.JSONRenderer',)
+        ('config.renderers.ORJSONRenderer',)
         if not DEBUG
         else (
-            'rest_framework.renderers.JSONRenderer',
+            'config.renderers.ORJSONRenderer',
             'rest_framework.renderers.BrowsableAPIRenderer',
         )
     ),
@@ -170,6 +190,9 @@ SANDBOX_CONFIG = {
     'DOCKER_NETWORK': os.getenv('DOCKER_NETWORK', 'sql-learning-sandbox'),
 }
 
+# Result rows kept on a stored submission (grading sees the full result)
+SUBMISSION_STORED_RESULT_ROWS = int(os.getenv('SUBMISSION_STORED_RESULT_ROWS', '500'))
+
 # Database images for sandbox (SQLite runs locally, no container needed)
 SANDBOX_IMAGES = {
     'postgresql': 'postgres:15-alpine',
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from django.db.models import Exists, OuterRef
+from django.utils import timezone
 from .models import Course, Enrollment, Dataset, Lesson, LessonExercise, Module, Attachment
 from users.serializers import UserSerializer
 
@@ -208,8 +209,12 @@ class LessonDetailSerializer(serializers.ModelSerializer):
 
     @staticmethod
     def _sync_exercises(lesson, exercises_data):
+        """Apply the exercise list with one query each for update, insert and delete."""
         existing = {str(e.id): e for e in lesson.exercises.all()}
         seen_ids = set()
+        to_update, to_create = [], []
+        update_fields = {'dataset_id', 'updated_at'}
+        now = timezone.now()
         for idx, ex_data in enumerate(exercises_data):
             dataset_id = ex_data.pop('dataset_id', None)
             ex_data.setdefault('order', idx)
@@ -219,18 +224,25 @@ class LessonDetailSerializer(serializers.ModelSerializer):
                 for field, val in ex_data.items():
                     setattr(ex, field, val)
                 ex.dataset_id = dataset_id
-                ex.save()
+                # bulk_update skips auto_now, so stamp it here
+                ex.updated_at = now
+                update_fields.update(ex_data)
+                to_update.append(ex)
                 seen_ids.add(str(ex_id))
             else:
-                LessonExercise.objects.create(
+                to_create.append(LessonExercise(
                     lesson=lesson,
                     dataset_id=dataset_id,
                     **ex_data,
-                )
+                ))
+        if to_update:
+            LessonExercise.objects.bulk_update(to_update, sorted(update_fields))
+        if to_create:
+            LessonExercise.objects.bulk_create(to_create)
         # Delete exercises not present in the payload
-        for ex_id, ex in existing.items():
-            if ex_id not in seen_ids:
-                ex.delete()
+        removed = [ex_id for ex_id in existing if ex_id not in seen_ids]
+        if removed:
+            lesson.exercises.filter(id__in=removed).delete()
 
 
 class LessonCreateSerializer(serializers.ModelSerializer):
@@ -255,15 +267,15 @@ class LessonCreateSerializer(serializers.ModelSerializer):
         module_id = validated_data.pop('module_id')
         exercises_data = validated_data.pop('exercises', [])
         lesson = Lesson.objects.create(module_id=module_id, **validated_data)
-        for idx, ex_data in enumerate(exercises_data):
-            dataset_id = ex_data.pop('dataset_id', None)
-            order = ex_data.pop('order', idx)
-            LessonExercise.objects.create(
+        LessonExercise.objects.bulk_create([
+            LessonExercise(
                 lesson=lesson,
-                order=order,
-                dataset_id=dataset_id,
+                order=ex_data.pop('order', idx),
+                dataset_id=ex_data.pop('dataset_id', None),
                 **ex_data,
             )
+            for idx, ex_data in enumerate(exercises_data)
+        ])
         return lesson
 
 
@@ -8,4 +8,8 @@ echo "Collecting static files..."
 python manage.py collectstatic --noinput 2>/dev/null || true
 
 echo "Starting gunicorn..."
-exec gunicorn --bind 0.0.0.0:8000 --workers 2 --timeout 120 --graceful-timeout 30 config.wsgi:application
+# Threaded workers: a request blocked on a sandbox query holds one thread,
+# not a whole worker process
+exec gunicorn --bind 0.0.0.0:8000 --workers 2 \
+    --worker-class gthread --threads "${GUNICORN_THREADS:-8}" \
+    --timeout 120 --graceful-timeout 30 config.wsgi:application
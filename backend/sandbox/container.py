@@ -1,6 +1,7 @@
 """Docker container management for sandbox databases."""
 
 import logging
+import random
 import uuid
 import time
 from dataclasses import dataclass
@@ -83,6 +84,12 @@ CONTAINER_CONFIGS = {
 class ContainerInfo:
     """Information about a running container."""
 
+    __slots__ = (
+        'id', 'container_id', 'database_type', 'host', 'port',
+        'internal_port', 'created_at', 'last_used_at', 'executions_count',
+        'dataset_id',
+    )
+
     def __init__(self, container_id: str, database_type: str,
                  host: str, port: int, internal_port: int):
         self.id = str(uuid.uuid4())
@@ -206,6 +213,7 @@ class ContainerManager:
         last_error = None
 
         executor_class = get_executor(info.database_type)
+        attempt = 0
 
         while time.time() - start_time < timeout:
             try:
@@ -219,7 +227,10 @@ class ContainerManager:
                 return
             except Exception as e:
                 last_error = e
-                time.sleep(1)
+                # Capped exponential backoff with jitter so containers
+                # starting together don't probe in lockstep
+                time.sleep(min(0.1 * 2 ** attempt, 2.0) + random.random() * 0.1)
+                attempt += 1
 
         raise ContainerTimeoutError(
             f'Container failed to become ready within {timeout}s. Last error: {last_error}'
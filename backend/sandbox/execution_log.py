@@ -0,0 +1,131 @@
+"""Background writer for execution audit logs.
+
+Keeps the ExecutionLog INSERT off the request path: entries are queued
+in memory and a daemon thread writes them in batches with bulk_create.
+"""
+
+import atexit
+import logging
+import queue
+import threading
+import time
+from typing import Optional
+
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 100
+FLUSH_INTERVAL = 0.25  # seconds to wait for a batch to fill
+MAX_PENDING = 10000  # drop entries beyond this rather than grow unbounded
+
+# Text fields are truncated here, in submit(), before queueing, so a
+# backlog never holds full-length queries; callers pass them as-is
+FIELD_LIMITS = {
+    'query': 10000,
+    'error_message': 1000,
+}
+
+
+class ExecutionLogWriter:
+    """Batches ExecutionLog rows and inserts them from a worker thread."""
+
+    def __init__(self):
+        self._queue: queue.Queue[dict] = queue.Queue(maxsize=MAX_PENDING)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, **fields) -> None:
+        """Queue an ExecutionLog row for writing. Never blocks."""
+        for name, limit in FIELD_LIMITS.items():
+            value = fields.get(name)
+            if value and len(value) > limit:
+                fields[name] = value[:limit]
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(fields)
+        except queue.Full:
+            logger.warning('Execution log queue is full, dropping entry')
+
+    def flush(self) -> None:
+        """Write everything queued so far on the calling thread."""
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+            if len(batch) >= BATCH_SIZE:
+                self._write(batch)
+                batch = []
+        if batch:
+            self._write(batch)
+
+    def _ensure_started(self) -> None:
+        """Start the worker thread on first use."""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run,
+                    daemon=True,
+                    name='execution-log-writer',
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        """Worker loop: collect up to BATCH_SIZE rows or FLUSH_INTERVAL."""
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + FLUSH_INTERVAL
+            while len(batch) < BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    @staticmethod
+    def _write(batch: list[dict]) -> None:
+        """Insert a batch of rows, logging (not raising) on failure."""
+        from .models import ExecutionLog
+
+        close_old_connections()
+        try:
+            ExecutionLog.objects.bulk_create(
+                [ExecutionLog(**fields) for fields in batch]
+            )
+        except Exception as e:
+            logger.warning(f'Failed to write {len(batch)} execution logs: {e}')
+
+
+# Global writer instance
+_writer: Optional[ExecutionLogWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_execution_log_writer() -> ExecutionLogWriter:
+    """Get the global execution log writer."""
+    global _writer
+    writer = _writer
+    if writer is not None:
+        return writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = ExecutionLogWriter()
+            # Persist whatever is still queued when the process exits
+            atexit.register(_writer.flush)
+        return _writer
+
+
+def log_execution(**fields) -> None:
+    """Queue an ExecutionLog row; see ExecutionLog for the fields.
+
+    Long query and error_message values are truncated to FIELD_LIMITS
+    before queueing, so callers can pass them as-is.
+    """
+    get_execution_log_writer().submit(**fields)
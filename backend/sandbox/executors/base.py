@@ -62,6 +62,22 @@ class BaseExecutor(ABC):
         """Check if connection is active."""
         pass
 
+    def connection_lost(self) -> bool:
+        """Check locally, without a round-trip, if the connection is unusable.
+
+        Only catches connections the driver already knows are broken, so it
+        is cheap enough to run before every query, unlike is_connected().
+        """
+        return self._connection is None
+
+    def discard_session_state(self) -> bool:
+        """Clear per-connection state so the connection can serve another user.
+
+        Returns True if the connection is clean and may be reused; the
+        default is False, so executors are not reused unless they opt in.
+        """
+        return False
+
     @abstractmethod
     def execute_query(self, query: str, timeout: int = 10) -> QueryResult:
         """Execute a query and return the result."""
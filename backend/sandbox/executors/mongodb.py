@@ -66,6 +66,10 @@ class MongoDBExecutor(BaseExecutor):
         except Exception:
             return False
 
+    def connection_lost(self) -> bool:
+        """MongoClient reconnects on its own; only a missing client is lost."""
+        return self._db is None
+
     def execute_query(self, query: str, timeout: int = 10) -> QueryResult:
         """Execute a MongoDB query/command.
 
@@ -54,6 +54,10 @@ class MySQLExecutor(BaseExecutor):
         except Exception:
             return False
 
+    def connection_lost(self) -> bool:
+        """pymysql clears ``open`` once it sees the connection fail."""
+        return self._connection is None or not self._connection.open
+
     def execute_query(self, query: str, timeout: int = 10) -> QueryResult:
         """Execute a SQL query on MySQL/MariaDB."""
         if not self._connection:
@@ -56,6 +56,25 @@ class PostgreSQLExecutor(BaseExecutor):
         except Exception:
             return False
 
+    def connection_lost(self) -> bool:
+        """psycopg2 sets ``closed`` once it sees the connection fail."""
+        return self._connection is None or self._connection.closed != 0
+
+    def discard_session_state(self) -> bool:
+        """Drop temp tables, prepared statements and SET values.
+
+        DISCARD ALL fails inside an open transaction, which then makes the
+        connection non-reusable as well.
+        """
+        if self.connection_lost():
+            return False
+        try:
+            with self._connection.cursor() as cur:
+                cur.execute('DISCARD ALL')
+            return True
+        except psycopg2.Error:
+            return False
+
     def execute_query(self, query: str, timeout: int = 10) -> QueryResult:
         """Execute a SQL query on PostgreSQL."""
         if not self._connection:
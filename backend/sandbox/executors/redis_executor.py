@@ -85,6 +85,10 @@ class RedisExecutor(BaseExecutor):
         except Exception:
             return False
 
+    def connection_lost(self) -> bool:
+        """redis-py reconnects on its own; only a missing client is lost."""
+        return self._client is None
+
     def execute_query(self, query: str, timeout: int = 10) -> QueryResult:
         """Execute a Redis command.
 
@@ -1,9 +1,13 @@
 """Sandbox pool manager for database containers."""
 
+import atexit
 import logging
+import queue
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from types import MappingProxyType
 from typing import Optional
 
 from django.conf import settings
@@ -13,17 +17,15 @@ from .exceptions import (
     NoAvailableContainerError,
     DatabaseConnectionError,
 )
-from .query_validator import (
-    validate_sql,
-    validate_mongodb,
-    validate_redis,
-    QueryBlockedError,
-)
+from .query_validator import validate, QueryBlockedError
 
 logger = logging.getLogger(__name__)
 
+# Connected executors kept per database type for stateless queries
+IDLE_EXECUTORS_PER_TYPE = 4
+
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class DatabaseConfig:
     """Configuration for a sandbox database."""
     host: str
@@ -76,6 +78,13 @@ SANDBOX_DATABASES = {
     ),
 }
 
+# Executor classes resolved once at import time; ``_student`` variants
+# share the executor of their base database type.
+_EXECUTOR_CLASSES = MappingProxyType({
+    db_type: get_executor(db_type.removesuffix('_student'))
+    for db_type in (*SANDBOX_DATABASES, 'sqlite')
+})
+
 
 class SandboxPool:
     """
@@ -89,7 +98,18 @@ class SandboxPool:
         self._lock = threading.RLock()
         self._running = False
         self._available: dict[str, bool] = {}
+        # In-flight executions per database type. Guarded by its own small
+        # lock so counting never contends with pool state; readers skip it.
+        self._busy: dict[str, int] = {}
+        self._busy_lock = threading.Lock()
         self._check_thread: Optional[threading.Thread] = None
+        # Idle connected executors, reused so stateless queries skip the
+        # connect/auth round-trips. Only executors that can discard their
+        # session state (see BaseExecutor.discard_session_state) go back.
+        self._idle: dict[str, queue.LifoQueue[BaseExecutor]] = {
+            db_type: queue.LifoQueue(maxsize=IDLE_EXECUTORS_PER_TYPE)
+            for db_type in SANDBOX_DATABASES
+        }
 
     def start(self) -> None:
         """Start the pool and check database availability."""
@@ -115,33 +135,41 @@ class SandboxPool:
     def stop(self) -> None:
         """Stop the pool."""
         self._running = False
+        for idle in self._idle.values():
+            while True:
+                try:
+                    idle.get_nowait().disconnect()
+                except queue.Empty:
+                    break
         logger.info('Sandbox pool stopped')
 
     # Primary database types to health-check (excludes _student variants)
     _PRIMARY_DB_TYPES = ('postgresql', 'mariadb', 'mongodb', 'redis')
 
     def _check_availability(self) -> None:
-        """Check which databases are available."""
-        for db_type in self._PRIMARY_DB_TYPES:
-            config = SANDBOX_DATABASES.get(db_type)
-            if not config:
-                continue
-            try:
-                executor_class = get_executor(db_type)
-                executor = executor_class(
-                    host=config.host,
-                    port=config.port,
-                    database=config.database,
-                    user=config.user,
-                    password=config.password,
-                )
-                executor.connect()
-                executor.disconnect()
-                self._available[db_type] = True
-                logger.info(f'{db_type} sandbox is available')
-            except Exception as e:
-                self._available[db_type] = False
-                logger.warning(f'{db_type} sandbox is not available: {e}')
+        """Check which databases are available.
+
+        Types are probed in parallel, so one pass takes as long as the
+        slowest database rather than the sum, and the result replaces the
+        availability map in a single assignment.
+        """
+        with ThreadPoolExecutor(
+            max_workers=len(self._PRIMARY_DB_TYPES),
+            thread_name_prefix='sandbox-health-probe',
+        ) as probes:
+            results = probes.map(self._check_one, self._PRIMARY_DB_TYPES)
+            self._available = dict(zip(self._PRIMARY_DB_TYPES, results))
+
+    def _check_one(self, db_type: str) -> bool:
+        """Probe a single database type by connecting and disconnecting."""
+        try:
+            with self._new_executor(db_type):
+                pass
+            logger.info(f'{db_type} sandbox is available')
+            return True
+        except Exception as e:
+            logger.warning(f'{db_type} sandbox is not available: {e}')
+            return False
 
     def _health_check_loop(self) -> None:
         """Background health check loop."""
@@ -159,26 +187,64 @@ class SandboxPool:
             return True
         return self._available.get(database_type, False)
 
-    def get_executor(self, database_type: str) -> BaseExecutor:
-        """Get an executor for the specified database type."""
+    def availability_map(self) -> dict[str, bool]:
+        """Snapshot of availability for every database type, SQLite included."""
+        # The health check swaps in a new dict, so one read is consistent
+        return {**self._available, 'sqlite': True}
+
+    def _mark_busy(self, database_type: str, delta: int) -> None:
+        """Adjust the in-flight execution counter for a database type."""
+        with self._busy_lock:
+            self._busy[database_type] = self._busy.get(database_type, 0) + delta
+
+    def _new_executor(self, database_type: str) -> BaseExecutor:
+        """Build an unconnected executor for the specified database type.
+
+        Use it as a context manager to connect and always disconnect.
+        """
         if database_type == 'sqlite':
-            executor_class = get_executor(database_type)
-            executor = executor_class()
-            executor.connect()
-            return executor
+            return _EXECUTOR_CLASSES['sqlite']()
 
         if database_type not in SANDBOX_DATABASES:
             raise ValueError(f'Unknown database type: {database_type}')
 
         config = SANDBOX_DATABASES[database_type]
-        executor_class = get_executor(database_type)
-        executor = executor_class(
+        executor_class = _EXECUTOR_CLASSES[database_type]
+        return executor_class(
             host=config.host,
             port=config.port,
             database=config.database,
             user=config.user,
             password=config.password,
         )
+
+    def _checkout_executor(self, database_type: str) -> BaseExecutor:
+        """Take an idle connected executor, or connect a new one."""
+        idle = self._idle.get(database_type)
+        while idle is not None:
+            try:
+                executor = idle.get_nowait()
+            except queue.Empty:
+                break
+            if not executor.connection_lost():
+                return executor
+            executor.disconnect()
+        return self.get_executor(database_type)
+
+    def _checkin_executor(self, database_type: str, executor: BaseExecutor) -> None:
+        """Keep a clean executor for reuse; disconnect anything else."""
+        idle = self._idle.get(database_type)
+        if idle is not None and self._running and executor.discard_session_state():
+            try:
+                idle.put_nowait(executor)
+                return
+            except queue.Full:
+                pass
+        executor.disconnect()
+
+    def get_executor(self, database_type: str) -> BaseExecutor:
+        """Get a connected executor for the specified database type."""
+        executor = self._new_executor(database_type)
         executor.connect()
         return executor
 
@@ -193,12 +259,7 @@ class SandboxPool:
         """Execute a query in the sandbox."""
         # ── Security: validate query before execution ───────
         try:
-            if database_type in ('sqlite', 'postgresql', 'mariadb'):
-                validate_sql(query)
-            elif database_type == 'mongodb':
-                validate_mongodb(query)
-            elif database_type == 'redis':
-                validate_redis(query)
+            validate(database_type, query)
         except QueryBlockedError as e:
             self._log_blocked_query(query, database_type, e.message)
             return QueryResult(
@@ -206,25 +267,29 @@ class SandboxPool:
                 error_message=e.message,
             )
 
-        executor = None
+        self._mark_busy(database_type, 1)
         try:
-            executor = self.get_executor(database_type)
-
-            # Reset and initialize schema/data
-            executor.reset()
-
-            if schema_sql:
-                result = executor.initialize_schema(schema_sql)
-                if not result.success:
-                    return result
-
-            if seed_sql:
-                result = executor.load_data(seed_sql)
-                if not result.success:
-                    return result
-
-            # Execute the actual query
-            return executor.execute_query(query, timeout=timeout)
+            executor = self._checkout_executor(database_type)
+            try:
+                # Reset and initialize schema/data. A fresh in-memory SQLite
+                # database is always empty, so only shared servers need a reset.
+                if database_type != 'sqlite':
+                    executor.reset()
+
+                if schema_sql:
+                    result = executor.initialize_schema(schema_sql)
+                    if not result.success:
+                        return result
+
+                if seed_sql:
+                    result = executor.load_data(seed_sql)
+                    if not result.success:
+                        return result
+
+                # Execute the actual query
+                return executor.execute_query(query, timeout=timeout)
+            finally:
+                self._checkin_executor(database_type, executor)
 
         except Exception as e:
             logger.error(f'Query execution error: {e}')
@@ -234,11 +299,7 @@ class SandboxPool:
             )
 
         finally:
-            if executor:
-                try:
-                    executor.disconnect()
-                except Exception:
-                    pass
+            self._mark_busy(database_type, -1)
 
     # ── Session-based execution ────────────────────────────────
 
@@ -257,12 +318,7 @@ class SandboxPool:
 
         # Security: validate query (same as stateless path)
         try:
-            if database_type in ('sqlite', 'postgresql', 'mariadb'):
-                validate_sql(query)
-            elif database_type == 'mongodb':
-                validate_mongodb(query)
-            elif database_type == 'redis':
-                validate_redis(query)
+            validate(database_type, query)
         except QueryBlockedError as e:
             self._log_blocked_query(
                 query, database_type, e.message,
@@ -273,6 +329,7 @@ class SandboxPool:
                 error_message=e.message,
             )
 
+        self._mark_busy(database_type, 1)
         try:
             manager = get_session_manager()
             manager.get_or_create(
@@ -288,12 +345,18 @@ class SandboxPool:
                 success=False,
                 error_message=str(e),
             )
+        finally:
+            self._mark_busy(database_type, -1)
 
-    def reset_session(self, session_id: str) -> None:
-        """Reset (destroy) a session."""
+    def reset_session(self, session_id: str, background: bool = False) -> None:
+        """Reset (destroy) a session.
+
+        With ``background=True`` only the teardown of its resources is
+        deferred; the session itself is gone when this returns.
+        """
         from .session_manager import get_session_manager
         manager = get_session_manager()
-        manager.destroy(session_id)
+        manager.destroy(session_id, background=background)
 
     def destroy_session(self, session_id: str) -> None:
         """Destroy a session (alias for reset_session)."""
@@ -307,34 +370,36 @@ class SandboxPool:
         user_id: Optional[int] = None,
         session_id: str = '',
     ) -> None:
-        """Log a blocked query to the audit log."""
-        try:
-            from .models import ExecutionLog
-            ExecutionLog.objects.create(
-                query=query[:4096],
-                database_type=database_type,
-                session_id=session_id or '',
-                user_id=user_id,
-                execution_time_ms=0,
-                success=False,
-                error_message=error_message,
-                was_blocked=True,
-            )
-        except Exception as exc:
-            logger.warning(f'Failed to log blocked query: {exc}')
+        """Queue a blocked query for the background audit log writer."""
+        from .execution_log import log_execution
+        log_execution(
+            query=query,
+            database_type=database_type,
+            session_id=session_id or '',
+            user_id=user_id,
+            execution_time_ms=0,
+            success=False,
+            error_message=error_message,
+            was_blocked=True,
+        )
 
     def get_stats(self) -> dict:
-        """Get pool statistics."""
+        """Get pool statistics.
+
+        Returns a fresh dict on every call since callers extend it.
+        """
+        available = self._available
+        busy = self._busy
         return {
             'running': self._running,
             'pools': {
                 db_type: {
-                    'available': 1 if self._available.get(db_type, False) else 0,
-                    'busy': 0,
+                    'available': 1 if available.get(db_type, False) else 0,
+                    'busy': busy.get(db_type, 0),
                 }
                 for db_type in self._PRIMARY_DB_TYPES
             },
-            'sqlite': {'available': 1, 'busy': 0},
+            'sqlite': {'available': 1, 'busy': busy.get('sqlite', 0)},
         }
 
 
@@ -346,6 +411,10 @@ _pool_lock = threading.Lock()
 def get_sandbox_pool() -> SandboxPool:
     """Get the global sandbox pool instance."""
     global _sandbox_pool
+    # Fast path: no lock once the pool exists (reference reads are atomic)
+    pool = _sandbox_pool
+    if pool is not None:
+        return pool
     with _pool_lock:
         if _sandbox_pool is None:
             _sandbox_pool = SandboxPool()
@@ -372,6 +441,9 @@ def stop_sandbox_pool() -> None:
             _sandbox_pool = None
 
 
+# Tear the pool down on interpreter exit even if nobody calls stop
+atexit.register(stop_sandbox_pool)
+
 # Backwards compatibility
 start_warm_pool = start_sandbox_pool
 stop_warm_pool = stop_sandbox_pool
@@ -5,7 +5,9 @@ privilege escalation, and server configuration changes.
 Returns friendly messages for blocked queries.
 """
 
+import functools
 import re
+from typing import Optional
 
 # ── Friendly rejection messages ─────────────────────────────────
 MESSAGES = {
@@ -37,119 +39,182 @@ class QueryBlockedError(Exception):
 # ═══════════════════════════════════════════════════════════════
 
 # Patterns are matched against the query with comments stripped,
-# collapsed whitespace, and case-insensitive matching.
+# collapsed whitespace, and case-insensitive matching. The third element
+# lists the engines a rule applies to; engine-specific rules are skipped
+# when validating for another engine, where they cannot do harm.
+
+_PG = frozenset({'postgresql'})
+_MARIADB = frozenset({'mariadb'})
+_SQLITE = frozenset({'sqlite'})
+_ALL_SQL = _PG | _MARIADB | _SQLITE
 
 _SQL_RULES = [
     # ── File system access ──────────────────────────────────
-    (r'\bpg_read_file\b', MESSAGES['file_read']),
-    (r'\bpg_read_binary_file\b', MESSAGES['file_read']),
-    (r'\bpg_stat_file\b', MESSAGES['file_read']),
-    (r'\blo_import\b', MESSAGES['file_read']),
-    (r'\blo_export\b', MESSAGES['file_write']),
-    (r'\bload_file\b', MESSAGES['file_read']),
-    (r'\binto\s+outfile\b', MESSAGES['file_write']),
-    (r'\binto\s+dumpfile\b', MESSAGES['file_write']),
-    (r'\battach\s+database\b', MESSAGES['file_read']),
+    (r'\bpg_(?:read_file|read_binary_file|stat_file)\b', MESSAGES['file_read'], _PG),
+    (r'\blo_import\b', MESSAGES['file_read'], _PG),
+    (r'\blo_export\b', MESSAGES['file_write'], _PG),
+    (r'\bload_file\b', MESSAGES['file_read'], _MARIADB),
+    (r'\binto\s+(?:outfile|dumpfile)\b', MESSAGES['file_write'], _MARIADB),
+    (r'\battach\s+database\b', MESSAGES['file_read'], _SQLITE),
 
     # ── System command execution ────────────────────────────
-    (r'\bcopy\b.*\bto\s+program\b', MESSAGES['system_cmd']),
-    (r'\bcopy\b.*\bfrom\s+program\b', MESSAGES['system_cmd']),
-    (r'\bpg_execute_server_program\b', MESSAGES['system_cmd']),
+    (r'\bcopy\b.*\b(?:to|from)\s+program\b', MESSAGES['system_cmd'], _PG),
+    (r'\bpg_execute_server_program\b', MESSAGES['system_cmd'], _PG),
 
     # ── Privilege escalation / user info ────────────────────
-    (r'\bpg_shadow\b', MESSAGES['privilege']),
-    (r'\bpg_authid\b', MESSAGES['privilege']),
-    (r'\bpg_auth_members\b', MESSAGES['privilege']),
-    (r'\bpg_roles\b', MESSAGES['privilege']),
-    (r'\bpg_user\b', MESSAGES['privilege']),
-    (r'\binformation_schema\.user_privileges\b', MESSAGES['privilege']),
-    (r'\bmysql\.user\b', MESSAGES['privilege']),
-    (r'\bmysql\.db\b', MESSAGES['privilege']),
-    (r'\bmysql\.tables_priv\b', MESSAGES['privilege']),
-    (r'\bmysql\.columns_priv\b', MESSAGES['privilege']),
-    (r'\bmysql\.global_priv\b', MESSAGES['privilege']),
-    (r'\bperformance_schema\b', MESSAGES['privilege']),
+    (r'\bpg_(?:shadow|authid|auth_members|roles|user)\b', MESSAGES['privilege'], _PG),
+    (r'\binformation_schema\.user_privileges\b', MESSAGES['privilege'], _ALL_SQL),
+    (r'\bmysql\.(?:user|db|tables_priv|columns_priv|global_priv)\b', MESSAGES['privilege'], _MARIADB),
+    (r'\bperformance_schema\b', MESSAGES['privilege'], _MARIADB),
 
     # ── Server configuration ────────────────────────────────
-    (r'\bset\s+global\b', MESSAGES['server_config']),
-    (r'\balter\s+system\b', MESSAGES['server_config']),
-    (r'\bpg_reload_conf\b', MESSAGES['server_config']),
-    (r'\bpg_terminate_backend\b', MESSAGES['server_config']),
-    (r'\bpg_cancel_backend\b', MESSAGES['server_config']),
-    (r'\bpg_sleep\b', MESSAGES['server_config']),
+    (r'\bset\s+global\b', MESSAGES['server_config'], _MARIADB),
+    (r'\balter\s+system\b', MESSAGES['server_config'], _PG),
+    (r'\bpg_(?:reload_conf|terminate_backend|cancel_backend|sleep)\b', MESSAGES['server_config'], _PG),
 
     # ── Dangerous DDL / admin ───────────────────────────────
-    (r'\bcreate\s+role\b', MESSAGES['auth']),
-    (r'\bcreate\s+user\b', MESSAGES['auth']),
-    (r'\balter\s+role\b', MESSAGES['auth']),
-    (r'\balter\s+user\b', MESSAGES['auth']),
-    (r'\bdrop\s+role\b', MESSAGES['auth']),
-    (r'\bdrop\s+user\b', MESSAGES['auth']),
-    (r'\bgrant\b', MESSAGES['auth']),
-    (r'\brevoke\b', MESSAGES['auth']),
-    (r'\bcreate\s+extension\b', MESSAGES['extension']),
-    (r'\bcreate\s+(?:or\s+replace\s+)?function\b', MESSAGES['system_cmd']),
-    (r'\bcreate\s+(?:or\s+replace\s+)?procedure\b', MESSAGES['system_cmd']),
-    (r'\bcreate\s+trigger\b', MESSAGES['system_cmd']),
-    (r'\bcreate\s+event\b', MESSAGES['system_cmd']),
-    (r'\bdo\s*\$', MESSAGES['system_cmd']),
+    (r'\bcreate\s+(?:role|user)\b', MESSAGES['auth'], _ALL_SQL),
+    (r'\balter\s+(?:role|user)\b', MESSAGES['auth'], _ALL_SQL),
+    (r'\bdrop\s+(?:role|user)\b', MESSAGES['auth'], _ALL_SQL),
+    (r'\bgrant\b', MESSAGES['auth'], _ALL_SQL),
+    (r'\brevoke\b', MESSAGES['auth'], _ALL_SQL),
+    (r'\bcreate\s+extension\b', MESSAGES['extension'], _PG),
+    (r'\bcreate\s+(?:or\s+replace\s+)?(?:function|procedure)\b', MESSAGES['system_cmd'], _ALL_SQL),
+    (r'\bcreate\s+trigger\b', MESSAGES['system_cmd'], _ALL_SQL),
+    (r'\bcreate\s+event\b', MESSAGES['system_cmd'], _MARIADB),
+    (r'\bdo\s*\$', MESSAGES['system_cmd'], _PG),
 
     # ── Session isolation (prevent schema/db escape) ────────
-    (r'\bcreate\s+schema\b', MESSAGES['destructive']),
-    (r'\bdrop\s+schema\b', MESSAGES['destructive']),
-    (r'\bset\s+search_path\b', MESSAGES['server_config']),
-    (r'\buse\s+\w', MESSAGES['server_config']),
+    (r'\bcreate\s+schema\b', MESSAGES['destructive'], _ALL_SQL),
+    (r'\bdrop\s+schema\b', MESSAGES['destructive'], _ALL_SQL),
+    (r'\bset\s+search_path\b', MESSAGES['server_config'], _PG),
+    (r'\buse\s+\w', MESSAGES['server_config'], _MARIADB),
 
     # ── Destructive server-wide operations ──────────────────
-    (r'\bdrop\s+database\b', MESSAGES['destructive']),
-    (r'\bcreate\s+database\b', MESSAGES['destructive']),
-    (r'\bdrop\s+tablespace\b', MESSAGES['destructive']),
+    (r'\bdrop\s+database\b', MESSAGES['destructive'], _ALL_SQL),
+    (r'\bcreate\s+database\b', MESSAGES['destructive'], _ALL_SQL),
+    (r'\bdrop\s+tablespace\b', MESSAGES['destructive'], _ALL_SQL),
 
     # ── Network / external access ───────────────────────────
-    (r'\bdblink\b', MESSAGES['network']),
-    (r'\bpostgres_fdw\b', MESSAGES['network']),
-    (r'\bcreate\s+server\b', MESSAGES['network']),
-    (r'\bcreate\s+foreign\b', MESSAGES['network']),
+    (r'\bdblink\b', MESSAGES['network'], _PG),
+    (r'\bpostgres_fdw\b', MESSAGES['network'], _PG),
+    (r'\bcreate\s+(?:server|foreign)\b', MESSAGES['network'], _ALL_SQL),
 
     # ── UNION-based information disclosure ──────────────────
-    (r'\bunion\s+(?:all\s+)?select\b', MESSAGES['info_leak']),
+    (r'\bunion\s+(?:all\s+)?select\b', MESSAGES['info_leak'], _ALL_SQL),
 
     # ── Information leaking ─────────────────────────────────
-    (r'\bpg_ls_dir\b', MESSAGES['info_leak']),
-    (r'\bpg_ls_logdir\b', MESSAGES['info_leak']),
-    (r'\bpg_ls_waldir\b', MESSAGES['info_leak']),
-    (r'\bcurrent_setting\b', MESSAGES['info_leak']),
-    (r'\bpg_hba_file_rules\b', MESSAGES['info_leak']),
-    (r'\bshow\s+variables\b', MESSAGES['info_leak']),
-    (r'\bshow\s+grants\b', MESSAGES['info_leak']),
-    (r'\bshow\s+(?:master|slave|replica)\b', MESSAGES['replication']),
+    (r'\bpg_ls_(?:dir|logdir|waldir)\b', MESSAGES['info_leak'], _PG),
+    (r'\bcurrent_setting\b', MESSAGES['info_leak'], _PG),
+    (r'\bpg_hba_file_rules\b', MESSAGES['info_leak'], _PG),
+    (r'\bshow\s+(?:variables|grants)\b', MESSAGES['info_leak'], _MARIADB),
+    (r'\bshow\s+(?:master|slave|replica)\b', MESSAGES['replication'], _MARIADB),
 ]
 
-# Pre-compile all SQL patterns
-_COMPILED_SQL_RULES = [(re.compile(pat, re.IGNORECASE), msg) for pat, msg in _SQL_RULES]
+
+def _compile_rules(rules: list[tuple[str, str]]) -> tuple[re.Pattern, dict[str, str]]:
+    """Fuse (pattern, message) rules into one alternation regex.
+
+    Each rule becomes a named group, so a single scan finds the first
+    offending rule and ``match.lastgroup`` maps straight to its message.
+    When every rule starts with ``\\b`` it is hoisted in front of the
+    alternation, so positions inside words are rejected once instead of
+    once per branch.
+    """
+    hoist = all(pat.startswith(r'\b') for pat, _ in rules)
+    branches = '|'.join(
+        f'(?P<r{i}>{pat[2:] if hoist else pat})'
+        for i, (pat, _) in enumerate(rules)
+    )
+    pattern = re.compile(rf'\b(?:{branches})' if hoist else branches, re.IGNORECASE)
+    messages = {f'r{i}': msg for i, (_, msg) in enumerate(rules)}
+    return pattern, messages
+
+
+_WORD = re.compile(r'\w+')
+
+# ``\bkeyword`` or ``\bprefix(?:a|b)`` followed by something that
+# can't continue the word
+_LEADING_KEYWORD = re.compile(
+    r'\\b([A-Za-z_]+)(?:\(\?:([A-Za-z_|]+)\))?'
+    r'(?:\\b|\\s\+|(?:\\s\*)?\\[$.(])'
+)
+
+
+def _rule_keywords(rules: list[tuple[str, str]]) -> Optional[frozenset[str]]:
+    """Collect the whole-word keyword each rule starts with.
+
+    A query can only match a rule if it contains that rule's keyword as a
+    word. Returns None if some rule has no such keyword, in which case no
+    prefilter is possible.
+    """
+    keywords = set()
+    for pat, _ in rules:
+        match = _LEADING_KEYWORD.match(pat)
+        if not match:
+            return None
+        prefix, alternatives = match.groups()
+        if alternatives:
+            keywords.update((prefix + alt).lower() for alt in alternatives.split('|'))
+        else:
+            keywords.add(prefix.lower())
+    return frozenset(keywords)
+
+
+def _compile_sql_rules(
+    engine: Optional[str],
+) -> tuple[re.Pattern, dict[str, str], Optional[frozenset[str]]]:
+    """Compile the SQL rules that apply to an engine (None: all rules)."""
+    rules = [
+        (pat, msg) for pat, msg, engines in _SQL_RULES
+        if engine is None or engine in engines
+    ]
+    pattern, messages = _compile_rules(rules)
+    return pattern, messages, _rule_keywords(rules)
+
+
+# Pre-compile one fused regex per engine, plus one covering every rule
+_SQL_MATCHERS = {
+    engine: _compile_sql_rules(engine)
+    for engine in (None, *sorted(_ALL_SQL))
+}
+
+
+# Any run of whitespace, block comments and line comments
+_SQL_GAP = re.compile(r'(?:\s|/\*.*?\*/|--[^\n]*)+', re.DOTALL)
 
 
 def _strip_sql_comments(query: str) -> str:
-    """Remove SQL comments (-- line and /* block */) to prevent bypass."""
-    # Remove block comments
-    query = re.sub(r'/\*.*?\*/', ' ', query, flags=re.DOTALL)
-    # Remove line comments
-    query = re.sub(r'--[^\n]*', ' ', query)
-    # Collapse whitespace
-    query = re.sub(r'\s+', ' ', query).strip()
-    return query
+    """Remove SQL comments (-- line and /* block */) to prevent bypass.
+
+    A single left-to-right pass replaces each run of comments and
+    whitespace with one space, so comment markers nested inside other
+    comments are resolved the same way the database reads them.
+    """
+    return _SQL_GAP.sub(' ', query).strip()
 
 
-def validate_sql(query: str) -> None:
+def validate_sql(query: str, database_type: Optional[str] = None) -> None:
     """Validate SQL query for PostgreSQL, MariaDB, and SQLite.
 
-    Raises QueryBlockedError if the query contains dangerous patterns.
+    With a database_type only the rules for that engine are checked;
+    otherwise every rule is. Raises QueryBlockedError if the query
+    contains dangerous patterns.
     """
+    pattern, messages, keywords = _SQL_MATCHERS.get(
+        database_type, _SQL_MATCHERS[None],
+    )
     cleaned = _strip_sql_comments(query)
 
-    for pattern, message in _COMPILED_SQL_RULES:
-        if pattern.search(cleaned):
-            raise QueryBlockedError(message)
+    # Prefilter: most queries contain none of the rule keywords as words.
+    # ASCII only, since IGNORECASE also folds some non-ASCII letters.
+    if (keywords is not None and cleaned.isascii()
+            and keywords.isdisjoint(_WORD.findall(cleaned.lower()))):
+        return
+
+    match = pattern.search(cleaned)
+    if match:
+        raise QueryBlockedError(messages[match.lastgroup])
 
 
 # ═══════════════════════════════════════════════════════════════
@@ -167,11 +232,11 @@ _MONGO_BLOCKED_PATTERNS = [
     (r'\bfsyncUnlock\b', MESSAGES['destructive']),
 
     # Code execution
-    (r'\b\$where\b', MESSAGES['system_cmd']),
+    (r'\$where\b', MESSAGES['system_cmd']),
     (r'\beval\b', MESSAGES['system_cmd']),
     (r'\bsystem\b', MESSAGES['system_cmd']),
-    (r'\b\$function\b', MESSAGES['system_cmd']),
-    (r'\b\$accumulator\b', MESSAGES['system_cmd']),
+    (r'\$function\b', MESSAGES['system_cmd']),
+    (r'\$accumulator\b', MESSAGES['system_cmd']),
     (r'\bmapReduce\b', MESSAGES['system_cmd']),
 
     # Auth / users
@@ -206,7 +271,7 @@ _MONGO_BLOCKED_PATTERNS = [
     (r'\bexec\s*\(', MESSAGES['system_cmd']),
 ]
 
-_COMPILED_MONGO_RULES = [(re.compile(pat, re.IGNORECASE), msg) for pat, msg in _MONGO_BLOCKED_PATTERNS]
+_MONGO_PATTERN, _MONGO_MESSAGES = _compile_rules(_MONGO_BLOCKED_PATTERNS)
 
 
 def _decode_unicode_escapes(text: str) -> str:
@@ -231,9 +296,9 @@ def validate_mongodb(query: str) -> None:
             variants.append(decoded)
 
     for variant in variants:
-        for pattern, message in _COMPILED_MONGO_RULES:
-            if pattern.search(variant):
-                raise QueryBlockedError(message)
+        match = _MONGO_PATTERN.search(variant)
+        if match:
+            raise QueryBlockedError(_MONGO_MESSAGES[match.lastgroup])
 
 
 # ═══════════════════════════════════════════════════════════════
@@ -241,7 +306,7 @@ def validate_mongodb(query: str) -> None:
 # ═══════════════════════════════════════════════════════════════
 
 # Whitelist approach: only allow safe, learning-relevant commands
-_REDIS_ALLOWED_COMMANDS = {
+_REDIS_ALLOWED_COMMANDS = frozenset({
     # Strings
     'SET', 'GET', 'MSET', 'MGET', 'APPEND', 'STRLEN',
     'INCR', 'INCRBY', 'INCRBYFLOAT', 'DECR', 'DECRBY',
@@ -299,6 +364,41 @@ _REDIS_ALLOWED_COMMANDS = {
 
     # Info (read-only, useful for learning)
     'INFO',
+})
+
+# Specific messages for commonly attempted dangerous commands
+_REDIS_BLOCKED_MESSAGES = {
+    'CONFIG': MESSAGES['server_config'],
+    'FLUSHALL': MESSAGES['destructive'],
+    'FLUSHDB': MESSAGES['destructive'],
+    'SHUTDOWN': MESSAGES['destructive'],
+    'SLAVEOF': MESSAGES['replication'],
+    'REPLICAOF': MESSAGES['replication'],
+    'DEBUG': MESSAGES['system_cmd'],
+    'MODULE': MESSAGES['extension'],
+    'ACL': MESSAGES['auth'],
+    'AUTH': MESSAGES['auth'],
+    'BGSAVE': MESSAGES['server_config'],
+    'BGREWRITEAOF': MESSAGES['server_config'],
+    'SAVE': MESSAGES['server_config'],
+    'MIGRATE': MESSAGES['network'],
+    'CLUSTER': MESSAGES['server_config'],
+    'CLIENT': MESSAGES['info_leak'],
+    'COMMAND': MESSAGES['info_leak'],
+    'LATENCY': MESSAGES['info_leak'],
+    'MEMORY': MESSAGES['info_leak'],
+    'SLOWLOG': MESSAGES['info_leak'],
+    'SWAPDB': MESSAGES['destructive'],
+    'SELECT': MESSAGES['server_config'],
+    'MONITOR': MESSAGES['info_leak'],
+    'WAIT': MESSAGES['server_config'],
+    'RESTORE': MESSAGES['server_config'],
+    'DUMP': MESSAGES['info_leak'],
+    'SCRIPT': MESSAGES['system_cmd'],
+    'EVAL': MESSAGES['system_cmd'],
+    'EVALSHA': MESSAGES['system_cmd'],
+    'FUNCTION': MESSAGES['system_cmd'],
+    'FCALL': MESSAGES['system_cmd'],
 }
 
 
@@ -307,46 +407,62 @@ def validate_redis(query: str) -> None:
 
     Raises QueryBlockedError if the command is not in the allowed list.
     """
-    parts = query.strip().split()
+    # Only the first token matters; don't tokenize large value payloads
+    parts = query.split(maxsplit=1)
     if not parts:
         return
 
     command = parts[0].upper()
 
     if command not in _REDIS_ALLOWED_COMMANDS:
-        # Provide specific messages for commonly attempted dangerous commands
-        dangerous_map = {
-            'CONFIG': MESSAGES['server_config'],
-            'FLUSHALL': MESSAGES['destructive'],
-            'FLUSHDB': MESSAGES['destructive'],
-            'SHUTDOWN': MESSAGES['destructive'],
-            'SLAVEOF': MESSAGES['replication'],
-            'REPLICAOF': MESSAGES['replication'],
-            'DEBUG': MESSAGES['system_cmd'],
-            'MODULE': MESSAGES['extension'],
-            'ACL': MESSAGES['auth'],
-            'AUTH': MESSAGES['auth'],
-            'BGSAVE': MESSAGES['server_config'],
-            'BGREWRITEAOF': MESSAGES['server_config'],
-            'SAVE': MESSAGES['server_config'],
-            'MIGRATE': MESSAGES['network'],
-            'CLUSTER': MESSAGES['server_config'],
-            'CLIENT': MESSAGES['info_leak'],
-            'COMMAND': MESSAGES['info_leak'],
-            'LATENCY': MESSAGES['info_leak'],
-            'MEMORY': MESSAGES['info_leak'],
-            'SLOWLOG': MESSAGES['info_leak'],
-            'SWAPDB': MESSAGES['destructive'],
-            'SELECT': MESSAGES['server_config'],
-            'MONITOR': MESSAGES['info_leak'],
-            'WAIT': MESSAGES['server_config'],
-            'RESTORE': MESSAGES['server_config'],
-            'DUMP': MESSAGES['info_leak'],
-            'SCRIPT': MESSAGES['system_cmd'],
-            'EVAL': MESSAGES['system_cmd'],
-            'EVALSHA': MESSAGES['system_cmd'],
-            'FUNCTION': MESSAGES['system_cmd'],
-            'FCALL': MESSAGES['system_cmd'],
-        }
-        msg = dangerous_map.get(command, f"The command '{command}' is not available in the sandbox. Stick to data commands like GET, SET, HSET, LPUSH, ZADD, etc.")
+        msg = _REDIS_BLOCKED_MESSAGES.get(command, f"The command '{command}' is not available in the sandbox. Stick to data commands like GET, SET, HSET, LPUSH, ZADD, etc.")
         raise QueryBlockedError(msg)
+
+
+# ═══════════════════════════════════════════════════════════════
+#  Dispatch by database type
+# ═══════════════════════════════════════════════════════════════
+
+_VALIDATORS = {
+    'sqlite': functools.partial(validate_sql, database_type='sqlite'),
+    'postgresql': functools.partial(validate_sql, database_type='postgresql'),
+    'postgresql_student': functools.partial(validate_sql, database_type='postgresql'),
+    'mariadb': functools.partial(validate_sql, database_type='mariadb'),
+    'mariadb_student': functools.partial(validate_sql, database_type='mariadb'),
+    'mongodb': validate_mongodb,
+    'redis': validate_redis,
+}
+
+
+# Longer queries are validated uncached so the cache never pins big strings
+_MAX_CACHED_QUERY_LENGTH = 4096
+
+
+def _blocked_message(database_type: str, query: str) -> Optional[str]:
+    """Return the rejection message for a query, or None if it is allowed."""
+    validator = _VALIDATORS.get(database_type)
+    if validator is None:
+        return None
+    try:
+        validator(query)
+    except QueryBlockedError as e:
+        return e.message
+    return None
+
+
+_cached_blocked_message = functools.lru_cache(maxsize=4096)(_blocked_message)
+
+
+def validate(database_type: str, query: str) -> None:
+    """Validate a query with the validator for its database type.
+
+    Verdicts for queries up to _MAX_CACHED_QUERY_LENGTH characters are
+    memoized, so re-submitting the same query skips the pattern sweep.
+    Raises QueryBlockedError if the query is blocked.
+    """
+    if len(query) <= _MAX_CACHED_QUERY_LENGTH:
+        message = _cached_blocked_message(database_type, query)
+    else:
+        message = _blocked_message(database_type, query)
+    if message is not None:
+        raise QueryBlockedError(message)
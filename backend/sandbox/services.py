@@ -2,25 +2,31 @@
 
 import logging
 from dataclasses import dataclass
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 from uuid import UUID
 
 from django.conf import settings
-from django.utils import timezone
 
-from .pool import get_sandbox_pool, SandboxPool
-from .executors import QueryResult
-from .models import ExecutionLog
+from .execution_log import log_execution
 from .exceptions import (
     SandboxError,
     QueryTimeoutError,
     DatasetInitializationError,
 )
 
+# The pool (and with it every DB driver) and the ORM are imported lazily
+# so importing this module stays cheap.
+if TYPE_CHECKING:
+    from .executors import QueryResult
+    from .pool import SandboxPool
+
 logger = logging.getLogger(__name__)
 
+DB_STATS_CACHE_KEY = 'sandbox:execution-stats'
+DB_STATS_CACHE_TTL = 10  # seconds
+
 
-@dataclass
+@dataclass(slots=True)
 class ExecutionRequest:
     """Request to execute a query."""
     database_type: str
@@ -32,12 +38,16 @@ class ExecutionRequest:
     submission_id: Optional[UUID] = None
     dataset_id: Optional[UUID] = None
 
+    def __post_init__(self):
+        # Clamp once here so execution can use the timeout as-is
+        self.timeout = min(self.timeout, settings.SANDBOX_CONFIG.get('MAX_QUERY_TIME', 30))
 
-@dataclass
+
+@dataclass(slots=True)
 class ExecutionResponse:
     """Response from query execution."""
     success: bool
-    result: Optional[QueryResult] = None
+    result: Optional['QueryResult'] = None
     error_message: str = ''
     execution_time_ms: int = 0
     container_id: str = ''
@@ -49,7 +59,7 @@ class ExecutionResponse:
             'error_message': self.error_message,
             'execution_time_ms': self.execution_time_ms,
         }
-        if self.result:
+        if self.result is not None:
             data.update(self.result.to_dict())
         return data
 
@@ -62,9 +72,11 @@ class QueryExecutionService:
     database management, dataset initialization, and result handling.
     """
 
-    def __init__(self, pool: Optional[SandboxPool] = None):
-        self._pool = pool or get_sandbox_pool()
-        self._max_query_time = settings.SANDBOX_CONFIG.get('MAX_QUERY_TIME', 30)
+    def __init__(self, pool: Optional['SandboxPool'] = None):
+        if pool is None:
+            from .pool import get_sandbox_pool
+            pool = get_sandbox_pool()
+        self._pool = pool
 
     def execute(self, request: ExecutionRequest) -> ExecutionResponse:
         """
@@ -77,14 +89,12 @@ class QueryExecutionService:
             ExecutionResponse with results or error
         """
         try:
-            timeout = min(request.timeout, self._max_query_time)
-
             result = self._pool.execute_query(
                 database_type=request.database_type,
                 query=request.query,
                 schema_sql=request.schema_sql,
                 seed_sql=request.seed_sql,
-                timeout=timeout,
+                timeout=request.timeout,
             )
 
             # Log execution
@@ -125,45 +135,54 @@ class QueryExecutionService:
                 error_message='Internal error during query execution',
             )
 
-    def _log_execution(self, database_type: str, query: str, result: QueryResult,
+    def _log_execution(self, database_type: str, query: str, result: 'QueryResult',
                        user_id: Optional[UUID], submission_id: Optional[UUID]) -> None:
-        """Log query execution to database."""
-        try:
-            ExecutionLog.objects.create(
-                container=None,
-                user_id=user_id,
-                submission_id=submission_id,
-                query=query[:10000],
-                execution_time_ms=result.execution_time_ms,
-                success=result.success,
-                error_message=result.error_message[:1000] if result.error_message else '',
-            )
-        except Exception as e:
-            logger.warning(f'Failed to log execution: {e}')
+        """Queue query execution for the background audit log writer."""
+        log_execution(
+            container=None,
+            database_type=database_type,
+            user_id=user_id,
+            submission_id=submission_id,
+            query=query,
+            execution_time_ms=result.execution_time_ms,
+            success=result.success,
+            error_message=result.error_message or '',
+        )
 
     def get_stats(self) -> dict:
         """Get service statistics."""
+        from django.core.cache import cache
+
         pool_stats = self._pool.get_stats()
 
         try:
-            recent_executions = ExecutionLog.objects.filter(
-                created_at__gte=timezone.now() - timezone.timedelta(hours=1)
-            ).count()
-
-            success_count = ExecutionLog.objects.filter(
-                created_at__gte=timezone.now() - timezone.timedelta(hours=1),
-                success=True
-            ).count()
-
-            pool_stats['db_stats'] = {
-                'executions_last_hour': recent_executions,
-                'success_rate': success_count / recent_executions if recent_executions > 0 else 1.0,
-            }
+            pool_stats['db_stats'] = cache.get_or_set(
+                DB_STATS_CACHE_KEY, self._compute_db_stats, DB_STATS_CACHE_TTL,
+            )
         except Exception as e:
             logger.warning(f'Failed to get DB stats: {e}')
 
         return pool_stats
 
+    @staticmethod
+    def _compute_db_stats() -> dict:
+        """Count last-hour executions and successes in a single query."""
+        from django.db.models import Count, Q
+        from django.utils import timezone
+        from .models import ExecutionLog
+
+        counts = ExecutionLog.objects.filter(
+            created_at__gte=timezone.now() - timezone.timedelta(hours=1)
+        ).aggregate(
+            total=Count('id'),
+            succeeded=Count('id', filter=Q(success=True)),
+        )
+        total = counts['total']
+        return {
+            'executions_last_hour': total,
+            'success_rate': counts['succeeded'] / total if total > 0 else 1.0,
+        }
+
 
 # Global service instance
 _query_service: Optional[QueryExecutionService] = None
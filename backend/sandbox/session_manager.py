@@ -4,29 +4,54 @@ Provides persistent sandbox sessions where state survives across queries.
 Sessions auto-expire after 15 minutes of inactivity.
 """
 
-import json
+import functools
+import heapq
+import itertools
 import logging
+import os
+import queue
 import threading
 import time
 import uuid
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from typing import Optional
 
+import orjson
+import psycopg2
+import pymysql
 import redis as redis_lib
+from psycopg2 import extensions
+from psycopg2 import sql as psql
+from pymysql.constants import CLIENT
 
+# The executors import the same drivers, so importing them here is free
 from .executors import get_executor, BaseExecutor, QueryResult
 from .exceptions import DatabaseConnectionError
+from .pool import SANDBOX_DATABASES
 
 logger = logging.getLogger(__name__)
 
 SESSION_TTL = 15 * 60  # 15 minutes
-CLEANUP_INTERVAL = 60  # check every 60 seconds
 MAX_SESSIONS = 100  # hard cap on concurrent sessions
+MAX_SESSIONS_PER_USER = 5  # one user cannot fill the global cap
+CLEANUP_WORKERS = 16  # parallel teardowns on shutdown / bulk expiry
+RELEASE_WORKERS = 4  # background teardowns queued by destroy(background=True)
+WARM_PG_EXECUTORS = 4  # pre-connected PostgreSQL executors kept ready
+MAX_RECONNECTS = 3  # consecutive reconnects before a session gives up
 SESSION_REDIS_HOST = 'sql-session-redis'
 SESSION_REDIS_PORT = 6379
+SESSION_REDIS_MAX_CONNECTIONS = 16
+MARIADB_ROOT_PASSWORD = os.getenv('MARIADB_ROOT_PASSWORD', 'rootpassword')
 
 
-@dataclass
+@functools.lru_cache(maxsize=MAX_SESSIONS * 2)
+def _search_path_sql(schema: str):
+    """Composed ``SET search_path`` for a session schema, built once per schema."""
+    return psql.SQL('SET search_path TO {}').format(psql.Identifier(schema))
+
+
+@dataclass(slots=True)
 class SandboxSession:
     """A persistent sandbox session."""
     session_id: str
@@ -34,24 +59,24 @@ class SandboxSession:
     schema_sql: str
     seed_sql: str
     executor: BaseExecutor
-    created_at: float
-    last_used_at: float
+    created_at: float  # wall clock, for metadata
+    last_used_at: float  # time.monotonic(); drives TTL expiry
     isolation_id: Optional[str] = None  # schema name / db name / redis key prefix
     user_id: Optional[int] = None  # owner user ID — prevents session hijacking
     # Per-session lock so queries on the same session are serialized,
     # but different sessions run in parallel.
-    _exec_lock: threading.Lock = None
-
-    def __post_init__(self):
-        if self._exec_lock is None:
-            self._exec_lock = threading.Lock()
+    _exec_lock: threading.Lock = field(default_factory=threading.Lock)
+    # Reconnects since the last successful query; bounded by MAX_RECONNECTS
+    _reconnect_count: int = 0
 
 
 class SessionManager:
     """Manages persistent sandbox sessions with per-DB isolation.
 
     Locking strategy:
-      - self._lock protects self._sessions dict (quick ops only)
+      - Lookups and pops on self._sessions are single dict operations
+        (atomic under the GIL) and take no lock
+      - self._lock only serializes the create/replace path and _creating
       - Heavy I/O (DB connect, schema create, DROP) runs OUTSIDE self._lock
       - Each session has its own _exec_lock for query serialization
     """
@@ -62,6 +87,42 @@ class SessionManager:
         self._cleanup_thread: Optional[threading.Thread] = None
         self._running = False
         self._session_redis: Optional[redis_lib.Redis] = None
+        # Shared, bounded pool for background teardowns; created on first use
+        self._release_pool: Optional[ThreadPoolExecutor] = None
+        # Single-flight: session_id -> event set once its creation finishes
+        self._creating: dict[str, threading.Event] = {}
+        # Long-lived admin connections for schema/database DDL, one per
+        # engine, each used by one thread at a time
+        self._admin_conns: dict = {}
+        self._admin_locks = {
+            'postgresql': threading.Lock(),
+            'mariadb': threading.Lock(),
+        }
+        # Per-type creation and teardown, keyed by database_type
+        self._creators = {
+            'sqlite': self._create_sqlite_session,
+            'postgresql': self._create_postgresql_session,
+            'mariadb': self._create_mariadb_session,
+            'mongodb': self._create_mongodb_session,
+            'redis': self._create_redis_session,
+        }
+        self._releasers = {
+            'sqlite': self._release_sqlite_session,
+            'postgresql': self._release_postgresql_session,
+            'mariadb': self._release_mariadb_session,
+            'mongodb': self._release_mongodb_session,
+            'redis': self._release_redis_session,
+        }
+        # Pre-connected PostgreSQL executors for new sessions; a session
+        # only has to point search_path at its schema to take one over
+        self._warm_pg: queue.Queue[BaseExecutor] = queue.Queue(maxsize=WARM_PG_EXECUTORS)
+        self._warm_refill_lock = threading.Lock()
+        # Min-heap of (deadline, seq, session) that the cleanup thread
+        # sleeps on. Entries are not updated on use; a popped entry whose
+        # session was used since is simply pushed again with its new deadline.
+        self._expiry_heap: list[tuple[float, int, SandboxSession]] = []
+        self._expiry_cond = threading.Condition()
+        self._expiry_seq = itertools.count()
 
     def start(self) -> None:
         """Start the session manager and cleanup thread."""
@@ -75,17 +136,33 @@ class SessionManager:
             name='session-cleanup',
         )
         self._cleanup_thread.start()
+        self._schedule_warm_refill()
         logger.info('Session manager started')
 
     def stop(self) -> None:
         """Stop the session manager and destroy all sessions."""
         self._running = False
+        with self._expiry_cond:
+            self._expiry_heap.clear()
+            self._expiry_cond.notify()
         # Collect all sessions under lock, then destroy outside
         with self._lock:
             sessions_to_destroy = list(self._sessions.values())
             self._sessions.clear()
-        for session in sessions_to_destroy:
-            self._cleanup_session_resources(session)
+        self._cleanup_sessions(sessions_to_destroy)
+        # Let queued background teardowns finish before admin connections close
+        with self._lock:
+            release_pool, self._release_pool = self._release_pool, None
+        if release_pool:
+            release_pool.shutdown(wait=True)
+        while True:
+            try:
+                self._warm_pg.get_nowait().disconnect()
+            except queue.Empty:
+                break
+        for db_type, lock in self._admin_locks.items():
+            with lock:
+                self._close_admin_connection(db_type)
         if self._session_redis:
             try:
                 self._session_redis.close()
@@ -97,14 +174,18 @@ class SessionManager:
     def _connect_session_redis(self) -> None:
         """Connect to the dedicated session-redis for metadata storage."""
         try:
-            self._session_redis = redis_lib.Redis(
+            pool = redis_lib.BlockingConnectionPool(
                 host=SESSION_REDIS_HOST,
                 port=SESSION_REDIS_PORT,
                 db=0,
-                decode_responses=True,
+                max_connections=SESSION_REDIS_MAX_CONNECTIONS,
+                timeout=5,  # wait this long for a free connection
+                # Metadata is orjson bytes; no str round-trip needed
+                decode_responses=False,
                 socket_timeout=5,
                 socket_connect_timeout=5,
             )
+            self._session_redis = redis_lib.Redis(connection_pool=pool)
             self._session_redis.ping()
             logger.info('Connected to session-redis for metadata')
         except Exception as e:
@@ -124,9 +205,11 @@ class SessionManager:
 
         Heavy I/O (session creation) runs OUTSIDE the global lock so
         20 users creating sessions concurrently won't serialize.
+        Concurrent requests for the same new session are coalesced: one
+        thread builds it while the others wait and then take the fast path.
         """
-        # Fast path: session exists
-        with self._lock:
+        while True:
+            # Fast path: session exists (lock-free lookup)
             session = self._sessions.get(session_id)
             if session and session.database_type == database_type:
                 # Verify ownership — prevent session hijacking
@@ -135,22 +218,104 @@ class SessionManager:
                         raise DatabaseConnectionError(
                             'Session belongs to another user.'
                         )
-                session.last_used_at = time.time()
-                self._touch_redis_ttl(session_id)
-                return session
+                session.last_used_at = time.monotonic()
+                break
 
-            # DB type changed — mark old session for cleanup
-            old_session = None
-            if session:
-                old_session = self._sessions.pop(session_id, None)
+            with self._lock:
+                # Re-read under the lock; the session may have just appeared
+                session = self._sessions.get(session_id)
+                if session and session.database_type == database_type:
+                    continue
+
+                pending = self._creating.get(session_id)
+                if pending is None:
+                    # DB type changed — mark old session for cleanup
+                    old_session = None
+                    if session:
+                        old_session = self._sessions.pop(session_id, None)
+
+                    # Make room only at the expense of expired sessions or
+                    # the caller's own; another user's live session (and the
+                    # state in it) is never evicted
+                    evicted = None
+                    if (user_id is not None
+                            and self._count_user_sessions(user_id) >= MAX_SESSIONS_PER_USER):
+                        evicted = self._pop_lru_session(user_id, include_expired=False)
+                        if evicted is None:
+                            raise DatabaseConnectionError(
+                                f'Too many open sessions ({MAX_SESSIONS_PER_USER}). '
+                                f'Close one and try again.'
+                            )
+                    elif len(self._sessions) >= MAX_SESSIONS:
+                        evicted = self._pop_lru_session(user_id, include_expired=True)
+                        if evicted is None:
+                            raise DatabaseConnectionError(
+                                f'Too many active sessions ({MAX_SESSIONS}). '
+                                f'Please try again later.'
+                            )
+
+                    pending = threading.Event()
+                    self._creating[session_id] = pending
+                    session = None
+                    break
+
+            # Another thread is building this session — wait, then retry
+            pending.wait()
+
+        if session is not None:
+            self._touch_redis_ttl(session_id)
+            return session
 
-            # Check session limit
-            if len(self._sessions) >= MAX_SESSIONS:
-                raise DatabaseConnectionError(
-                    f'Too many active sessions ({MAX_SESSIONS}). '
-                    f'Please try again later.'
-                )
+        try:
+            if evicted:
+                # Keep its redis metadata so the owner's next request
+                # transparently rebuilds it
+                logger.info(f'Evicting session {evicted.session_id} to make room')
+                self._cleanup_session_resources(evicted)
+            return self._build_session(
+                session_id, database_type, schema_sql, seed_sql,
+                user_id, old_session,
+            )
+        finally:
+            with self._lock:
+                self._creating.pop(session_id, None)
+            pending.set()
+
+    def _count_user_sessions(self, user_id: int) -> int:
+        """Number of open sessions owned by ``user_id``. Caller holds self._lock."""
+        return sum(1 for s in self._sessions.values() if s.user_id == user_id)
 
+    def _pop_lru_session(
+        self, user_id: Optional[int], include_expired: bool,
+    ) -> Optional[SandboxSession]:
+        """Remove and return an evictable session not running a query.
+
+        Sessions past SESSION_TTL go first (when ``include_expired``), then
+        the least recently used of ``user_id``'s own. Caller holds
+        self._lock. A linear scan is fine at MAX_SESSIONS.
+        """
+        now = time.monotonic()
+        idle = [s for s in self._sessions.values() if not s._exec_lock.locked()]
+        candidates = []
+        if include_expired:
+            candidates = [s for s in idle if now - s.last_used_at > SESSION_TTL]
+        if not candidates and user_id is not None:
+            candidates = [s for s in idle if s.user_id == user_id]
+        if not candidates:
+            return None
+        victim = min(candidates, key=lambda s: s.last_used_at)
+        return self._sessions.pop(victim.session_id, None)
+
+    def _build_session(
+        self,
+        session_id: str,
+        database_type: str,
+        schema_sql: str,
+        seed_sql: str,
+        user_id: Optional[int],
+        old_session: Optional[SandboxSession],
+    ) -> SandboxSession:
+        """Build and register a session. Runs OUTSIDE the global lock."""
         # Destroy old session OUTSIDE lock (heavy I/O)
         if old_session:
             self._cleanup_session_resources(old_session)
@@ -159,15 +324,7 @@ class SessionManager:
         # Try cross-worker recovery OUTSIDE lock
         rebuilt = self._rebuild_from_redis(session_id, database_type)
         if rebuilt:
-            with self._lock:
-                # Double-check nobody else created it while we were rebuilding
-                if session_id not in self._sessions:
-                    self._sessions[session_id] = rebuilt
-                    return rebuilt
-                else:
-                    # Someone else beat us, clean up our rebuild
-                    self._cleanup_session_resources(rebuilt)
-                    return self._sessions[session_id]
+            return self._register_session(rebuilt)
 
         # Create new session OUTSIDE lock (heavy I/O: connect + schema + seed)
         new_session = self._create_session(
@@ -177,61 +334,68 @@ class SessionManager:
         # Stamp user_id on the new session
         new_session.user_id = user_id
 
-        # Register session under lock (quick dict insert)
-        with self._lock:
-            if session_id in self._sessions:
-                # Race: another thread created it. Clean up ours.
-                self._cleanup_session_resources(new_session)
-                return self._sessions[session_id]
-            self._sessions[session_id] = new_session
+        session = self._register_session(new_session)
+        if session is new_session:
+            self._save_meta_to_redis(new_session)
+        return session
 
-        self._save_meta_to_redis(new_session)
-        return new_session
+    def _register_session(self, session: SandboxSession) -> SandboxSession:
+        """Publish a built session, or return the one that got there first.
+
+        dict.setdefault is atomic, so this needs no lock.
+        """
+        existing = self._sessions.setdefault(session.session_id, session)
+        if existing is not session:
+            # Race: another thread registered it. Clean up ours.
+            self._cleanup_session_resources(session)
+            return existing
+        self._schedule_expiry(session)
+        return session
 
     def execute(
         self, session_id: str, query: str, timeout: int = 30,
         user_id: Optional[int] = None,
     ) -> QueryResult:
         """Execute a query in an existing session."""
-        # Grab session reference under global lock (fast)
-        with self._lock:
-            session = self._sessions.get(session_id)
-            if not session:
+        # Lock-free lookup: dict.get is atomic
+        session = self._sessions.get(session_id)
+        if not session:
+            return QueryResult(
+                success=False,
+                error_message='SESSION_EXPIRED',
+            )
+        # Verify ownership
+        if session.user_id is not None:
+            if user_id is None or session.user_id != user_id:
                 return QueryResult(
                     success=False,
-                    error_message='SESSION_EXPIRED',
+                    error_message='Session belongs to another user.',
                 )
-            # Verify ownership
-            if session.user_id is not None:
-                if user_id is None or session.user_id != user_id:
-                    return QueryResult(
-                        success=False,
-                        error_message='Session belongs to another user.',
-                    )
-            session.last_used_at = time.time()
+        session.last_used_at = time.monotonic()
 
         # Serialize queries on the SAME session (per-session lock),
         # but different sessions execute in parallel.
         with session._exec_lock:
             try:
-                # Check connection is still alive
-                if not session.executor.is_connected():
-                    logger.warning(f'Session {session_id}: reconnecting stale connection')
-                    try:
-                        session.executor.connect()
-                        # Restore PostgreSQL search_path after reconnect
-                        if session.database_type == 'postgresql' and session.isolation_id:
-                            from psycopg2 import sql as psql
-                            with session.executor._connection.cursor() as cur:
-                                cur.execute(psql.SQL('SET search_path TO {}').format(
-                                    psql.Identifier(session.isolation_id)))
-                    except Exception as e:
-                        return QueryResult(
-                            success=False,
-                            error_message=f'Connection lost and reconnect failed: {e}',
-                        )
-
-                return session.executor.execute_query(query, timeout=timeout)
+                # Local check only: a connection the driver already knows is
+                # broken is replaced before anything is sent, so the query
+                # runs exactly once on the new connection.
+                if session.executor.connection_lost():
+                    failed = self._reconnect(session)
+                    if failed:
+                        return failed
+
+                result = session.executor.execute_query(query, timeout=timeout)
+                if result.success:
+                    session._reconnect_count = 0
+                elif session.executor.connection_lost():
+                    # The connection dropped after the statement went out;
+                    # sessions autocommit, so it may already have been
+                    # applied. Reconnect for the next query, never re-run it.
+                    failed = self._reconnect(session)
+                    if failed:
+                        return failed
+                return result
             except Exception as e:
                 logger.error(f'Session {session_id} query error: {e}')
                 return QueryResult(
@@ -239,16 +403,78 @@ class SessionManager:
                     error_message=str(e),
                 )
 
-    def destroy(self, session_id: str) -> None:
-        """Destroy a session and clean up its resources."""
-        # Pop from dict under lock (fast)
-        with self._lock:
-            session = self._sessions.pop(session_id, None)
+    @staticmethod
+    def _reconnect(session: SandboxSession) -> Optional[QueryResult]:
+        """Reconnect a session's executor; returns an error result on failure."""
+        if session._reconnect_count >= MAX_RECONNECTS:
+            return QueryResult(
+                success=False,
+                error_message='Connection lost too many times. Please reset the session.',
+            )
+        session._reconnect_count += 1
+        logger.warning(f'Session {session.session_id}: reconnecting stale connection')
+        try:
+            session.executor.disconnect()
+            session.executor.connect()
+            # Restore PostgreSQL search_path after reconnect
+            if session.database_type == 'postgresql' and session.isolation_id:
+                with session.executor._connection.cursor() as cur:
+                    cur.execute(_search_path_sql(session.isolation_id))
+        except Exception as e:
+            return QueryResult(
+                success=False,
+                error_message=f'Connection lost and reconnect failed: {e}',
+            )
+        return None
+
+    def destroy(self, session_id: str, background: bool = False) -> None:
+        """Destroy a session and clean up its resources.
+
+        The session is unreachable as soon as this returns. With
+        ``background=True`` its connection and schema teardown is queued on
+        a small shared thread pool instead of running on the caller's.
+        """
+        # dict.pop is atomic, no lock needed
+        session = self._sessions.pop(session_id, None)
+        # The session may live in another worker; dropping its metadata
+        # still stops anyone from rebuilding it
+        self._delete_meta_from_redis(session_id)
+        if not session:
+            return
         # Cleanup outside lock (heavy I/O)
-        if session:
+        if background:
+            self._get_release_pool().submit(self._cleanup_session_resources, session)
+        else:
             self._cleanup_session_resources(session)
-            self._delete_meta_from_redis(session_id)
-            logger.info(f'Destroyed session {session_id} ({session.database_type})')
+        logger.info(f'Destroyed session {session_id} ({session.database_type})')
+
+    def _get_release_pool(self) -> ThreadPoolExecutor:
+        """Get the shared background-teardown pool, creating it on first use."""
+        with self._lock:
+            if self._release_pool is None:
+                self._release_pool = ThreadPoolExecutor(
+                    max_workers=RELEASE_WORKERS,
+                    thread_name_prefix='session-release',
+                )
+            return self._release_pool
+
+    def get_owner(self, session_id: str) -> Optional[str]:
+        """Return the owning user id of a session as a string, if known.
+
+        Sessions held by this worker answer from memory; others are looked
+        up in session-redis, so the check works across workers.
+        """
+        session = self._sessions.get(session_id)
+        if session is not None:
+            return str(session.user_id) if session.user_id is not None else None
+        if not self._session_redis:
+            return None
+        try:
+            owner = self._session_redis.get(f'session:{session_id}:owner')
+        except Exception as e:
+            logger.warning(f'Failed to read owner of session {session_id}: {e}')
+            return None
+        return owner.decode() if owner else None
 
     def _create_session(
         self,
@@ -258,29 +484,12 @@ class SessionManager:
         seed_sql: str,
     ) -> SandboxSession:
         """Create a new isolated session. Runs OUTSIDE the global lock."""
-        now = time.time()
         isolation_id = f's_{uuid.uuid4().hex[:12]}'
 
-        if database_type == 'sqlite':
-            executor = self._create_sqlite_session(schema_sql, seed_sql)
-        elif database_type == 'postgresql':
-            executor = self._create_postgresql_session(
-                isolation_id, schema_sql, seed_sql
-            )
-        elif database_type == 'mariadb':
-            executor = self._create_mariadb_session(
-                isolation_id, schema_sql, seed_sql
-            )
-        elif database_type == 'mongodb':
-            executor = self._create_mongodb_session(
-                isolation_id, schema_sql, seed_sql
-            )
-        elif database_type == 'redis':
-            executor = self._create_redis_session(
-                isolation_id, schema_sql, seed_sql
-            )
-        else:
+        creator = self._creators.get(database_type)
+        if creator is None:
             raise ValueError(f'Unsupported database type: {database_type}')
+        executor = creator(isolation_id, schema_sql, seed_sql)
 
         return SandboxSession(
             session_id=session_id,
@@ -288,17 +497,18 @@ class SessionManager:
             schema_sql=schema_sql,
             seed_sql=seed_sql,
             executor=executor,
-            created_at=now,
-            last_used_at=now,
+            created_at=time.time(),
+            last_used_at=time.monotonic(),
             isolation_id=isolation_id,
         )
 
     # ── Per-DB creation ──────────────────────────────────────────
+    # All creators share the (isolation_id, schema_sql, seed_sql) signature.
 
     def _create_sqlite_session(
-        self, schema_sql: str, seed_sql: str
+        self, isolation_id: str, schema_sql: str, seed_sql: str
     ) -> BaseExecutor:
-        """Create an in-memory SQLite session."""
+        """Create an in-memory SQLite session (isolated by construction)."""
         executor_class = get_executor('sqlite')
         executor = executor_class()
         executor.connect()
@@ -322,59 +532,58 @@ class SessionManager:
         self, isolation_id: str, schema_sql: str, seed_sql: str
     ) -> BaseExecutor:
         """Create a PostgreSQL session with its own schema."""
-        from .pool import SANDBOX_DATABASES
-        import psycopg2
-        from psycopg2 import extensions
-
-        config = SANDBOX_DATABASES['postgresql']
-
         student_config = SANDBOX_DATABASES.get('postgresql_student')
 
-        # Admin connection to create schema + grant to sandbox_student
-        admin_conn = psycopg2.connect(
-            host=config.host,
-            port=config.port,
-            database=config.database,
-            user=config.user,
-            password=config.password,
-            connect_timeout=10,
-        )
-        admin_conn.set_isolation_level(extensions.ISOLATION_LEVEL_AUTOCOMMIT)
-        try:
-            with admin_conn.cursor() as cur:
-                from psycopg2 import sql as psql
-                cur.execute(psql.SQL('CREATE SCHEMA IF NOT EXISTS {}').format(
-                    psql.Identifier(isolation_id)))
-                # Grant privileges to sandbox_student (defense-in-depth)
-                if student_config:
-                    cur.execute(psql.SQL('GRANT ALL ON SCHEMA {} TO sandbox_student').format(
-                        psql.Identifier(isolation_id)))
-                    cur.execute(psql.SQL('ALTER DEFAULT PRIVILEGES IN SCHEMA {} '
-                        'GRANT ALL ON TABLES TO sandbox_student').format(
-                        psql.Identifier(isolation_id)))
-                    cur.execute(psql.SQL('ALTER DEFAULT PRIVILEGES IN SCHEMA {} '
-                        'GRANT ALL ON SEQUENCES TO sandbox_student').format(
-                        psql.Identifier(isolation_id)))
-        finally:
-            admin_conn.close()
+        # Create schema + grant to sandbox_student on the admin connection
+        statements = [
+            psql.SQL('CREATE SCHEMA IF NOT EXISTS {}').format(
+                psql.Identifier(isolation_id)),
+        ]
+        # Grant privileges to sandbox_student (defense-in-depth)
+        if student_config:
+            statements += [
+                psql.SQL('GRANT ALL ON SCHEMA {} TO sandbox_student').format(
+                    psql.Identifier(isolation_id)),
+                psql.SQL('ALTER DEFAULT PRIVILEGES IN SCHEMA {} '
+                    'GRANT ALL ON TABLES TO sandbox_student').format(
+                    psql.Identifier(isolation_id)),
+                psql.SQL('ALTER DEFAULT PRIVILEGES IN SCHEMA {} '
+                    'GRANT ALL ON SEQUENCES TO sandbox_student').format(
+                    psql.Identifier(isolation_id)),
+            ]
 
-        # Create executor — use restricted sandbox_student if available
-        use_config = student_config or config
-        executor_class = get_executor('postgresql')
-        executor = executor_class(
-            host=use_config.host,
-            port=use_config.port,
-            database=use_config.database,
-            user=use_config.user,
-            password=use_config.password,
-        )
-        executor.connect()
+        executor = self._take_warm_pg_executor()
+
+        if executor is not None:
+            # Already connected: nothing to overlap the DDL with
+            try:
+                self._run_admin_statements('postgresql', statements)
+            except Exception:
+                executor.disconnect()
+                raise
+        else:
+            # The schema DDL and the student connection are independent, so
+            # run them concurrently instead of paying for both in sequence
+            with ThreadPoolExecutor(max_workers=1, thread_name_prefix='session-ddl') as ddl:
+                created = ddl.submit(self._run_admin_statements, 'postgresql', statements)
+                executor = self._new_pg_session_executor()
+                executor.connect()
+                try:
+                    created.result()
+                except Exception:
+                    executor.disconnect()
+                    raise
 
         # Set search_path to the isolated schema
-        with executor._connection.cursor() as cur:
-            from psycopg2 import sql as psql
-            cur.execute(psql.SQL('SET search_path TO {}').format(
-                psql.Identifier(isolation_id)))
+        try:
+            with executor._connection.cursor() as cur:
+                cur.execute(_search_path_sql(isolation_id))
+        except psycopg2.Error:
+            # A pre-warmed connection may have been dropped while idle
+            executor.disconnect()
+            executor.connect()
+            with executor._connection.cursor() as cur:
+                cur.execute(_search_path_sql(isolation_id))
 
         if schema_sql:
             result = executor.initialize_schema(schema_sql)
@@ -394,45 +603,86 @@ class SessionManager:
                 )
         return executor
 
+    @staticmethod
+    def _new_pg_session_executor() -> BaseExecutor:
+        """Unconnected executor for PostgreSQL sessions.
+
+        Uses the restricted sandbox_student role if it is configured.
+        """
+        config = (SANDBOX_DATABASES.get('postgresql_student')
+                  or SANDBOX_DATABASES['postgresql'])
+        return get_executor('postgresql')(
+            host=config.host,
+            port=config.port,
+            database=config.database,
+            user=config.user,
+            password=config.password,
+        )
+
+    def _take_warm_pg_executor(self) -> Optional[BaseExecutor]:
+        """Take a pre-connected PostgreSQL executor, if one is ready."""
+        while True:
+            try:
+                executor = self._warm_pg.get_nowait()
+            except queue.Empty:
+                executor = None
+                break
+            if not executor.connection_lost():
+                break
+            executor.disconnect()
+        self._schedule_warm_refill()
+        return executor
+
+    def _schedule_warm_refill(self) -> None:
+        """Top up the warm executor queue on a background thread."""
+        if self._running and not self._warm_refill_lock.locked():
+            threading.Thread(
+                target=self._refill_warm_pg,
+                daemon=True,
+                name='session-warmup',
+            ).start()
+
+    def _refill_warm_pg(self) -> None:
+        """Connect executors until the warm queue is full."""
+        if not self._warm_refill_lock.acquire(blocking=False):
+            return  # another refill is already running
+        try:
+            while self._running and not self._warm_pg.full():
+                executor = self._new_pg_session_executor()
+                executor.connect()
+                try:
+                    self._warm_pg.put_nowait(executor)
+                except queue.Full:
+                    executor.disconnect()
+                    break
+        except Exception as e:
+            logger.warning(f'Could not pre-warm PostgreSQL executors: {e}')
+        finally:
+            self._warm_refill_lock.release()
+
     def _create_mariadb_session(
         self, isolation_id: str, schema_sql: str, seed_sql: str
     ) -> BaseExecutor:
         """Create a MariaDB session with its own database."""
-        from .pool import SANDBOX_DATABASES
-        import pymysql
-
         config = SANDBOX_DATABASES['mariadb']
         student_config = SANDBOX_DATABASES.get('mariadb_student')
 
-        # Admin connection (root) to create database and grant access
-        import os
-        mariadb_root_pw = os.getenv('MARIADB_ROOT_PASSWORD', 'rootpassword')
-        admin_conn = pymysql.connect(
-            host=config.host,
-            port=config.port,
-            user='root',
-            password=mariadb_root_pw,
-            connect_timeout=10,
-            autocommit=True,
-        )
-        try:
-            with admin_conn.cursor() as cur:
-                safe_id = isolation_id.replace('`', '``')
-                cur.execute(f'CREATE DATABASE IF NOT EXISTS `{safe_id}`')
-                # Grant to admin user (for schema setup)
-                cur.execute(
-                    f"GRANT ALL PRIVILEGES ON `{safe_id}`.* "
-                    f"TO '{config.user}'@'%'"
-                )
-                # Grant to restricted student user (defense-in-depth)
-                if student_config:
-                    cur.execute(
-                        f"GRANT ALL PRIVILEGES ON `{safe_id}`.* "
-                        f"TO 'sandbox_student'@'%'"
-                    )
-                cur.execute('FLUSH PRIVILEGES')
-        finally:
-            admin_conn.close()
+        # Create database and grant access on the admin (root) connection
+        safe_id = isolation_id.replace('`', '``')
+        statements = [
+            f'CREATE DATABASE IF NOT EXISTS `{safe_id}`',
+            # Grant to admin user (for schema setup)
+            f"GRANT ALL PRIVILEGES ON `{safe_id}`.* "
+            f"TO '{config.user}'@'%'",
+        ]
+        # Grant to restricted student user (defense-in-depth)
+        if student_config:
+            statements.append(
+                f"GRANT ALL PRIVILEGES ON `{safe_id}`.* "
+                f"TO 'sandbox_student'@'%'"
+            )
+        # GRANT takes effect immediately; no FLUSH PRIVILEGES needed
+        self._run_admin_statements('mariadb', statements)
 
         # Use admin user for schema/seed setup first
         executor_class = get_executor('mariadb')
@@ -480,8 +730,6 @@ class SessionManager:
         self, isolation_id: str, schema_sql: str, seed_sql: str
     ) -> BaseExecutor:
         """Create a MongoDB session with its own database."""
-        from .pool import SANDBOX_DATABASES
-
         config = SANDBOX_DATABASES['mongodb']
         executor_class = get_executor('mongodb')
         executor = executor_class(
@@ -511,8 +759,6 @@ class SessionManager:
         self, key_prefix: str, schema_sql: str, seed_sql: str
     ) -> BaseExecutor:
         """Create a Redis session isolated by key prefix."""
-        from .pool import SANDBOX_DATABASES
-
         config = SANDBOX_DATABASES['redis']
         executor_class = get_executor('redis')
         executor = executor_class(
@@ -543,40 +789,113 @@ class SessionManager:
 
     def _cleanup_session_resources(self, session: SandboxSession) -> None:
         """Clean up a session's DB resources. Safe to call outside lock."""
-        db_type = session.database_type
-        isolation_id = session.isolation_id
-
+        release = self._releasers.get(session.database_type)
+        if release is None:
+            return
         try:
-            if db_type == 'sqlite':
-                session.executor.disconnect()
-            elif db_type == 'postgresql':
-                session.executor.disconnect()
-                if isolation_id:
-                    self._drop_pg_schema(isolation_id)
-            elif db_type == 'mariadb':
-                session.executor.disconnect()
-                if isolation_id:
-                    self._drop_mariadb_database(isolation_id)
-            elif db_type == 'mongodb':
-                if session.executor._client and isolation_id:
-                    session.executor._client.drop_database(isolation_id)
-                session.executor.disconnect()
-            elif db_type == 'redis':
-                session.executor.reset()  # prefix-scoped key cleanup
-                session.executor.disconnect()
+            release(session)
         except Exception as e:
             logger.warning(
                 f'Error cleaning up session {session.session_id}: {e}'
             )
 
+    def _release_sqlite_session(self, session: SandboxSession) -> None:
+        session.executor.disconnect()
+
+    def _release_postgresql_session(self, session: SandboxSession) -> None:
+        session.executor.disconnect()
+        if session.isolation_id:
+            self._drop_pg_schema(session.isolation_id)
+
+    def _release_mariadb_session(self, session: SandboxSession) -> None:
+        session.executor.disconnect()
+        if session.isolation_id:
+            self._drop_mariadb_database(session.isolation_id)
+
+    def _release_mongodb_session(self, session: SandboxSession) -> None:
+        if session.executor._client and session.isolation_id:
+            session.executor._client.drop_database(session.isolation_id)
+        session.executor.disconnect()
+
+    def _release_redis_session(self, session: SandboxSession) -> None:
+        session.executor.reset()  # prefix-scoped key cleanup
+        session.executor.disconnect()
+
+    def _cleanup_sessions(self, sessions: list[SandboxSession]) -> None:
+        """Clean up many sessions, overlapping their I/O on a thread pool.
+
+        DDL still goes through the per-engine admin connection one batch at
+        a time; disconnects and MongoDB/Redis cleanup run in parallel.
+        """
+        if len(sessions) <= 1:
+            for session in sessions:
+                self._cleanup_session_resources(session)
+            return
+        with ThreadPoolExecutor(
+            max_workers=min(CLEANUP_WORKERS, len(sessions)),
+            thread_name_prefix='session-cleanup',
+        ) as pool:
+            # _cleanup_session_resources logs its own errors
+            list(pool.map(self._cleanup_session_resources, sessions))
+
     def _drop_pg_schema(self, schema_name: str) -> None:
         """Drop a PostgreSQL schema."""
-        from .pool import SANDBOX_DATABASES
-        import psycopg2
-        from psycopg2 import extensions
+        try:
+            self._run_admin_statements('postgresql', [
+                psql.SQL('DROP SCHEMA IF EXISTS {} CASCADE').format(
+                    psql.Identifier(schema_name)),
+            ])
+        except Exception as e:
+            logger.warning(f'Failed to drop PG schema {schema_name}: {e}')
 
-        config = SANDBOX_DATABASES['postgresql']
+    def _drop_mariadb_database(self, db_name: str) -> None:
+        """Drop a MariaDB database."""
+        safe_name = db_name.replace('`', '``')
         try:
+            self._run_admin_statements('mariadb', [
+                f'DROP DATABASE IF EXISTS `{safe_name}`',
+            ])
+        except Exception as e:
+            logger.warning(f'Failed to drop MariaDB database {db_name}: {e}')
+
+    # ── Shared admin connections ─────────────────────────────────
+
+    def _run_admin_statements(self, db_type: str, statements: list) -> None:
+        """Run DDL statements on the cached admin connection for db_type.
+
+        All statements are sent as one multi-statement batch, so they cost
+        a single round-trip. The connection is opened on first use and
+        reused afterwards. If it has gone stale the statements, which are
+        all idempotent, are retried once on a fresh connection.
+        """
+        if db_type == 'postgresql':
+            batch = psql.SQL('; ').join(statements)
+        else:
+            batch = '; '.join(statements)
+
+        with self._admin_locks[db_type]:
+            for attempt in range(2):
+                conn = self._admin_conns.get(db_type)
+                if conn is None:
+                    conn = self._connect_admin(db_type)
+                    self._admin_conns[db_type] = conn
+                try:
+                    with conn.cursor() as cur:
+                        cur.execute(batch)
+                        # pymysql needs every result consumed before reuse
+                        while db_type == 'mariadb' and cur.nextset():
+                            pass
+                    return
+                except self._admin_connection_errors(db_type):
+                    self._close_admin_connection(db_type)
+                    if attempt:
+                        raise
+
+    @staticmethod
+    def _connect_admin(db_type: str):
+        """Open an autocommit admin connection for DDL."""
+        config = SANDBOX_DATABASES[db_type]
+        if db_type == 'postgresql':
             conn = psycopg2.connect(
                 host=config.host,
                 port=config.port,
@@ -586,37 +905,34 @@ class SessionManager:
                 connect_timeout=10,
             )
             conn.set_isolation_level(extensions.ISOLATION_LEVEL_AUTOCOMMIT)
-            from psycopg2 import sql as psql
-            with conn.cursor() as cur:
-                cur.execute(psql.SQL('DROP SCHEMA IF EXISTS {} CASCADE').format(
-                    psql.Identifier(schema_name)))
-            conn.close()
-        except Exception as e:
-            logger.warning(f'Failed to drop PG schema {schema_name}: {e}')
+            return conn
 
-    def _drop_mariadb_database(self, db_name: str) -> None:
-        """Drop a MariaDB database."""
-        from .pool import SANDBOX_DATABASES
-        import pymysql
+        # MariaDB: root is needed to create databases and grant access
+        return pymysql.connect(
+            host=config.host,
+            port=config.port,
+            user='root',
+            password=MARIADB_ROOT_PASSWORD,
+            connect_timeout=10,
+            autocommit=True,
+            client_flag=CLIENT.MULTI_STATEMENTS,
+        )
 
-        config = SANDBOX_DATABASES['mariadb']
-        try:
-            import os
-            mariadb_root_pw = os.getenv('MARIADB_ROOT_PASSWORD', 'rootpassword')
-            conn = pymysql.connect(
-                host=config.host,
-                port=config.port,
-                user='root',
-                password=mariadb_root_pw,
-                connect_timeout=10,
-                autocommit=True,
-            )
-            with conn.cursor() as cur:
-                safe_name = db_name.replace('`', '``')
-                cur.execute(f'DROP DATABASE IF EXISTS `{safe_name}`')
-            conn.close()
-        except Exception as e:
-            logger.warning(f'Failed to drop MariaDB database {db_name}: {e}')
+    @staticmethod
+    def _admin_connection_errors(db_type: str) -> tuple:
+        """Exceptions that mean the admin connection itself is unusable."""
+        if db_type == 'postgresql':
+            return (psycopg2.OperationalError, psycopg2.InterfaceError)
+        return (pymysql.OperationalError, pymysql.InterfaceError)
+
+    def _close_admin_connection(self, db_type: str) -> None:
+        """Close and forget the cached admin connection. Caller holds its lock."""
+        conn = self._admin_conns.pop(db_type, None)
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
 
     # ── Cross-worker recovery via session-redis ──────────────────
 
@@ -634,11 +950,20 @@ class SessionManager:
                 'created_at': session.created_at,
                 'user_id': str(session.user_id) if session.user_id else None,
             }
-            self._session_redis.setex(
+            pipe = self._session_redis.pipeline(transaction=False)
+            pipe.setex(
                 f'session:{session.session_id}',
                 SESSION_TTL,
-                json.dumps(meta),
+                orjson.dumps(meta),
             )
+            if session.user_id is not None:
+                # Small separate key so ownership checks skip the schema/seed
+                pipe.setex(
+                    f'session:{session.session_id}:owner',
+                    SESSION_TTL,
+                    str(session.user_id),
+                )
+            pipe.execute()
         except Exception as e:
             logger.warning(f'Failed to save session meta to redis: {e}')
 
@@ -647,16 +972,23 @@ class SessionManager:
         if not self._session_redis:
             return
         try:
-            self._session_redis.expire(f'session:{session_id}', SESSION_TTL)
+            pipe = self._session_redis.pipeline(transaction=False)
+            pipe.expire(f'session:{session_id}', SESSION_TTL)
+            pipe.expire(f'session:{session_id}:owner', SESSION_TTL)
+            pipe.execute()
         except Exception:
             pass
 
-    def _delete_meta_from_redis(self, session_id: str) -> None:
-        """Delete session metadata from session-redis."""
-        if not self._session_redis:
+    def _delete_meta_from_redis(self, *session_ids: str) -> None:
+        """Delete session metadata from session-redis in one round-trip."""
+        if not self._session_redis or not session_ids:
             return
         try:
-            self._session_redis.delete(f'session:{session_id}')
+            self._session_redis.delete(*(
+                key
+                for session_id in session_ids
+                for key in (f'session:{session_id}', f'session:{session_id}:owner')
+            ))
         except Exception:
             pass
 
@@ -667,10 +999,15 @@ class SessionManager:
         if not self._session_redis:
             return None
         try:
-            raw = self._session_redis.get(f'session:{session_id}')
+            # GETEX reads the metadata and refreshes its TTL; the owner key
+            # rides along in the same round-trip
+            pipe = self._session_redis.pipeline(transaction=False)
+            pipe.getex(f'session:{session_id}', ex=SESSION_TTL)
+            pipe.expire(f'session:{session_id}:owner', SESSION_TTL)
+            raw, _ = pipe.execute()
             if not raw:
                 return None
-            meta = json.loads(raw)
+            meta = orjson.loads(raw)
             if meta['database_type'] != database_type:
                 return None
 
@@ -692,10 +1029,31 @@ class SessionManager:
 
     # ── Cleanup loop ─────────────────────────────────────────────
 
+    def _schedule_expiry(self, session: SandboxSession) -> None:
+        """Queue a newly registered session for the cleanup thread."""
+        with self._expiry_cond:
+            heapq.heappush(self._expiry_heap, (
+                session.last_used_at + SESSION_TTL,
+                next(self._expiry_seq),
+                session,
+            ))
+            self._expiry_cond.notify()
+
     def _cleanup_loop(self) -> None:
-        """Background thread that kills sessions idle > 15 minutes."""
+        """Background thread that kills sessions idle > 15 minutes.
+
+        Sleeps until the earliest deadline in the expiry heap instead of
+        polling, and is woken early when a new session is scheduled.
+        """
         while self._running:
-            time.sleep(CLEANUP_INTERVAL)
+            with self._expiry_cond:
+                timeout = None
+                if self._expiry_heap:
+                    timeout = self._expiry_heap[0][0] - time.monotonic()
+                if timeout is None or timeout > 0:
+                    self._expiry_cond.wait(timeout)
+            if not self._running:
+                break
             try:
                 self._cleanup_expired()
             except Exception as e:
@@ -704,26 +1062,36 @@ class SessionManager:
     def _cleanup_expired(self) -> None:
         """Find and destroy expired sessions.
 
-        Collects expired sessions under lock (fast), then cleans up outside.
+        Pops due entries from the expiry heap. Entries for sessions that
+        are gone or were replaced are dropped; sessions used since they
+        were scheduled are pushed back with their new deadline.
         """
-        now = time.time()
+        now = time.monotonic()
         expired_sessions: list[SandboxSession] = []
 
-        with self._lock:
-            expired_ids = [
-                sid for sid, s in self._sessions.items()
-                if now - s.last_used_at > SESSION_TTL
-            ]
-            for sid in expired_ids:
-                session = self._sessions.pop(sid, None)
-                if session:
+        with self._expiry_cond:
+            due = []
+            while self._expiry_heap and self._expiry_heap[0][0] <= now:
+                due.append(heapq.heappop(self._expiry_heap)[2])
+
+        # Never hold self._lock and the expiry condition together:
+        # registration takes them in the opposite order.
+        for session in due:
+            if session.last_used_at + SESSION_TTL > now:
+                if self._sessions.get(session.session_id) is session:
+                    self._schedule_expiry(session)
+                continue
+            with self._lock:
+                if self._sessions.get(session.session_id) is session:
+                    del self._sessions[session.session_id]
                     expired_sessions.append(session)
 
-        # Heavy cleanup outside lock
         for session in expired_sessions:
             logger.info(f'Expiring idle session {session.session_id}')
-            self._cleanup_session_resources(session)
-            self._delete_meta_from_redis(session.session_id)
+        self._cleanup_sessions(expired_sessions)
+        self._delete_meta_from_redis(
+            *(session.session_id for session in expired_sessions)
+        )
 
 
 # ── Global singleton ─────────────────────────────────────────────
@@ -1,3 +1,155 @@
-from django.test import TestCase
+from django.test import SimpleTestCase
 
-# Create your tests here.
+from .query_validator import QueryBlockedError, validate, validate_sql
+
+
+class SqlValidatorTests(SimpleTestCase):
+    """Per-engine blocklist: each rule only applies where it can do harm."""
+
+    BLOCKED = {
+        'postgresql': [
+            "SELECT pg_read_file('/etc/passwd')",
+            "SELECT lo_import('/etc/passwd')",
+            "COPY t TO PROGRAM 'id'",
+            "SELECT * FROM pg_shadow",
+            "ALTER SYSTEM SET work_mem = '1GB'",
+            "SELECT pg_sleep(10)",
+            "CREATE EXTENSION dblink",
+            "DO $$ BEGIN END $$",
+            "SET search_path TO public",
+            "SELECT current_setting('data_directory')",
+        ],
+        'mariadb': [
+            "SELECT load_file('/etc/passwd')",
+            "SELECT 1 INTO OUTFILE '/tmp/x'",
+            "SELECT * FROM mysql.user",
+            "SELECT * FROM performance_schema.threads",
+            "SET GLOBAL max_connections = 1",
+            "USE mysql",
+            "SHOW VARIABLES",
+            "CREATE EVENT e ON SCHEDULE EVERY 1 SECOND DO SELECT 1",
+        ],
+        'sqlite': [
+            "ATTACH DATABASE '/tmp/x.db' AS x",
+        ],
+    }
+
+    ALLOWED = {
+        'postgresql': [
+            "SELECT * FROM users WHERE id = 1",
+            "SELECT load_file FROM t",
+            "CREATE TABLE t (id serial primary key)",
+        ],
+        'mariadb': [
+            "SELECT * FROM users ORDER BY name",
+            "SELECT * FROM pg_shadow",
+            "INSERT INTO t (a) VALUES (1)",
+        ],
+        'sqlite': [
+            "SELECT count(*) FROM orders GROUP BY status",
+            "SELECT pg_sleep(10)",
+            "UPDATE t SET a = 1 WHERE id = 2",
+        ],
+    }
+
+    SHARED_BLOCKED = [
+        "CREATE USER bob",
+        "GRANT ALL ON t TO bob",
+        "REVOKE SELECT ON t FROM bob",
+        "CREATE FUNCTION f() RETURNS int",
+        "CREATE TRIGGER tr AFTER INSERT ON t",
+        "DROP SCHEMA public",
+        "DROP DATABASE x",
+        "SELECT a FROM t UNION SELECT b FROM u",
+    ]
+
+    def test_engine_rules_block(self):
+        for engine, queries in self.BLOCKED.items():
+            for query in queries:
+                with self.subTest(engine=engine, query=query):
+                    with self.assertRaises(QueryBlockedError):
+                        validate(engine, query)
+
+    def test_other_engine_rules_allow(self):
+        for engine, queries in self.ALLOWED.items():
+            for query in queries:
+                with self.subTest(engine=engine, query=query):
+                    validate(engine, query)
+
+    def test_shared_rules_block_every_engine(self):
+        for engine in ('postgresql', 'mariadb', 'sqlite'):
+            for query in self.SHARED_BLOCKED:
+                with self.subTest(engine=engine, query=query):
+                    with self.assertRaises(QueryBlockedError):
+                        validate(engine, query)
+
+    def test_student_aliases_use_engine_rules(self):
+        with self.assertRaises(QueryBlockedError):
+            validate('postgresql_student', "SELECT pg_read_file('x')")
+        with self.assertRaises(QueryBlockedError):
+            validate('mariadb_student', "SELECT load_file('x')")
+
+    def test_no_engine_checks_every_rule(self):
+        with self.assertRaises(QueryBlockedError):
+            validate_sql("ATTACH DATABASE 'x' AS x")
+        with self.assertRaises(QueryBlockedError):
+            validate_sql("SELECT load_file('x')")
+
+    def test_comments_do_not_hide_keywords(self):
+        for query in (
+            "DROP/**/DATABASE x",
+            "DROP -- hidden\nDATABASE x",
+            "UNION/* a */ /* b */SELECT 1",
+        ):
+            with self.subTest(query=query):
+                with self.assertRaises(QueryBlockedError):
+                    validate_sql(query)
+
+    def test_block_comment_opener_inside_line_comment(self):
+        # The /* sits inside a line comment, so the database runs the
+        # DROP on the next line; stripping must not swallow it.
+        with self.assertRaises(QueryBlockedError):
+            validate('postgresql', '-- /* \n DROP DATABASE x /* */')
+
+    def test_keyword_inside_identifier_allowed(self):
+        validate('postgresql', "SELECT granted, revoked_at FROM audit")
+
+
+class MongoValidatorTests(SimpleTestCase):
+
+    def test_blocked(self):
+        for query in (
+            "db.adminCommand({listDatabases: 1})",
+            "db.users.find({$where: 'sleep(1000)'})",
+            "db.users.find({$expr: {$function: {body: 'return 1'}}})",
+            "db.dropDatabase()",
+            "db.createUser({user: 'x'})",
+            "db.getSiblingDB('admin')",
+            "db.\\u0064ropDatabase()",
+        ):
+            with self.subTest(query=query):
+                with self.assertRaises(QueryBlockedError):
+                    validate('mongodb', query)
+
+    def test_allowed(self):
+        for query in (
+            "db.users.find({age: {$gt: 18}})",
+            "db.orders.aggregate([{$group: {_id: '$status'}}])",
+            "db.users.insertOne({name: 'Ann'})",
+        ):
+            with self.subTest(query=query):
+                validate('mongodb', query)
+
+
+class RedisValidatorTests(SimpleTestCase):
+
+    def test_blocked(self):
+        for query in ('FLUSHALL', 'CONFIG GET *', 'eval "return 1" 0', 'SELECT 1', 'UNKNOWNCMD x'):
+            with self.subTest(query=query):
+                with self.assertRaises(QueryBlockedError):
+                    validate('redis', query)
+
+    def test_allowed(self):
+        for query in ('SET k v', 'get k', 'HSET h f v', 'ZADD z 1 a', ''):
+            with self.subTest(query=query):
+                validate('redis', query)
@@ -1,5 +1,8 @@
 """API views for sandbox management."""
 
+import threading
+import time
+
 from django.db.models import Q
 from django.utils.decorators import method_decorator
 from django_ratelimit.decorators import ratelimit
@@ -12,6 +15,39 @@ from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from .pool import get_sandbox_pool
 from courses.models import Dataset
 
+_DB_TYPE_CHOICES = ('sqlite', 'postgresql', 'mariadb', 'mongodb', 'redis')
+_VALID_DB_TYPES = frozenset(_DB_TYPE_CHOICES)
+
+# Anything longer is abuse, not a student query; reject it before any I/O
+MAX_QUERY_LENGTH = 100_000  # characters
+
+# Probe endpoints are polled constantly; each worker memoizes their
+# payloads briefly so repeated hits share one computation. The memo is
+# per process (payloads describe this worker's own pool, and a shared
+# cache would cost a network round trip to save in-memory work). The TTL
+# is well under the probe interval, so real outages still show up.
+# ``?fresh=1`` bypasses the memo.
+_HEALTH_PROBE = 'health'
+_TYPES_PROBE = 'database-types'
+PROBE_MEMO_TTL = 2  # seconds
+
+_probe_memo: dict[str, tuple[float, object]] = {}
+_probe_memo_lock = threading.Lock()
+
+
+def _memoized_payload(request, probe, compute):
+    """Return compute()'s result, memoized in this process for PROBE_MEMO_TTL seconds."""
+    now = time.monotonic()
+    if request.query_params.get('fresh') != '1':
+        with _probe_memo_lock:
+            entry = _probe_memo.get(probe)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+    payload = compute()
+    with _probe_memo_lock:
+        _probe_memo[probe] = (now + PROBE_MEMO_TTL, payload)
+    return payload
+
 
 class ExecuteQueryView(APIView):
     """Execute query in sandbox - available for all authenticated users."""
@@ -28,10 +64,9 @@ class ExecuteQueryView(APIView):
         session_id = request.data.get('session_id')
 
         # Validate database type
-        valid_types = ['sqlite', 'postgresql', 'mariadb', 'mongodb', 'redis']
-        if database_type not in valid_types:
+        if database_type not in _VALID_DB_TYPES:
             return Response(
-                {'error': f'Invalid database type. Must be one of: {", ".join(valid_types)}'},
+                {'error': f'Invalid database type. Must be one of: {", ".join(_DB_TYPE_CHOICES)}'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
@@ -41,10 +76,25 @@ class ExecuteQueryView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        if len(query) > MAX_QUERY_LENGTH:
+            return Response(
+                {'error': f'Query is too long (max {MAX_QUERY_LENGTH} characters)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        pool = get_sandbox_pool()
+
+        # Check availability for non-SQLite databases
+        if database_type != 'sqlite' and not pool.is_available(database_type):
+            return Response(
+                {'error': f'{database_type} sandbox is not available. Please try again later.'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+
         # If dataset_id provided, load schema and seed from it
         if dataset_id:
             try:
-                dataset = Dataset.objects.get(id=dataset_id)
+                dataset = Dataset.objects.only('schema_sql', 'seed_sql').get(id=dataset_id)
                 schema_sql = dataset.schema_sql
                 seed_sql = dataset.seed_sql
             except Dataset.DoesNotExist:
@@ -53,16 +103,6 @@ class ExecuteQueryView(APIView):
                     status=status.HTTP_404_NOT_FOUND
                 )
 
-        # Execute query using the sandbox pool
-        pool = get_sandbox_pool()
-
-        # Check availability for non-SQLite databases
-        if database_type != 'sqlite' and not pool.is_available(database_type):
-            return Response(
-                {'error': f'{database_type} sandbox is not available. Please try again later.'},
-                status=status.HTTP_503_SERVICE_UNAVAILABLE
-            )
-
         # Session-based execution
         if session_id:
             result = pool.execute_query_in_session(
@@ -106,16 +146,50 @@ class SessionResetView(APIView):
         # Verify session ownership before allowing reset
         from .session_manager import get_session_manager
         manager = get_session_manager()
-        session = manager._sessions.get(session_id)
-        if session and session.user_id is not None and session.user_id != request.user.id:
+        owner = manager.get_owner(session_id)
+        if owner is not None and owner != str(request.user.id):
             return Response(
                 {'error': 'Not authorized to reset this session'},
                 status=status.HTTP_403_FORBIDDEN,
             )
 
         pool = get_sandbox_pool()
-        pool.reset_session(session_id)
-        return Response({'status': 'reset'})
+        # The session is dropped right away; its teardown (disconnect,
+        # schema drop) finishes in the background unless ?sync=1
+        if request.query_params.get('sync') == '1':
+            pool.reset_session(session_id)
+            return Response({'status': 'reset'})
+        pool.reset_session(session_id, background=True)
+        return Response({'status': 'reset_queued'}, status=status.HTTP_202_ACCEPTED)
+
+
+_DB_TYPES_STATIC = (
+    {
+        'value': 'sqlite',
+        'label': 'SQLite',
+        'description': 'Lightweight in-memory database. Great for learning SQL basics.',
+    },
+    {
+        'value': 'postgresql',
+        'label': 'PostgreSQL',
+        'description': 'Advanced open-source database with rich features.',
+    },
+    {
+        'value': 'mariadb',
+        'label': 'MariaDB',
+        'description': 'MySQL-compatible database with additional features.',
+    },
+    {
+        'value': 'mongodb',
+        'label': 'MongoDB',
+        'description': 'Document-oriented NoSQL database.',
+    },
+    {
+        'value': 'redis',
+        'label': 'Redis',
+        'description': 'In-memory key-value store.',
+    },
+)
 
 
 class DatabaseTypesView(APIView):
@@ -124,41 +198,17 @@ class DatabaseTypesView(APIView):
 
     def get(self, request):
         """Return list of available database types with availability status."""
-        pool = get_sandbox_pool()
+        return Response(
+            _memoized_payload(request, _TYPES_PROBE, self._compute_types)
+        )
 
-        types = [
-            {
-                'value': 'sqlite',
-                'label': 'SQLite',
-                'description': 'Lightweight in-memory database. Great for learning SQL basics.',
-                'available': True,
-            },
-            {
-                'value': 'postgresql',
-                'label': 'PostgreSQL',
-                'description': 'Advanced open-source database with rich features.',
-                'available': pool.is_available('postgresql'),
-            },
-            {
-                'value': 'mariadb',
-                'label': 'MariaDB',
-                'description': 'MySQL-compatible database with additional features.',
-                'available': pool.is_available('mariadb'),
-            },
-            {
-                'value': 'mongodb',
-                'label': 'MongoDB',
-                'description': 'Document-oriented NoSQL database.',
-                'available': pool.is_available('mongodb'),
-            },
-            {
-                'value': 'redis',
-                'label': 'Redis',
-                'description': 'In-memory key-value store.',
-                'available': pool.is_available('redis'),
-            },
+    @staticmethod
+    def _compute_types() -> list:
+        availability = get_sandbox_pool().availability_map()
+        return [
+            {**db_type, 'available': availability.get(db_type['value'], False)}
+            for db_type in _DB_TYPES_STATIC
         ]
-        return Response(types)
 
 
 class PublicDatasetsView(APIView):
@@ -171,33 +221,36 @@ class PublicDatasetsView(APIView):
 
         # Standalone system datasets + datasets from published courses + own datasets (for instructors)
         user = request.user
-        queryset = Dataset.objects.filter(
+        visible = (
             Q(course__isnull=True, created_by__isnull=True)  # system datasets
             | Q(course__is_published=True)  # published course datasets
-        ).select_related('course')
+        )
         if user.is_authenticated and user.is_instructor:
-            from django.db.models import Q as DjangoQ
-            queryset = Dataset.objects.filter(
-                DjangoQ(course__isnull=True, created_by__isnull=True)
-                | DjangoQ(course__is_published=True)
-                | DjangoQ(course__isnull=True, created_by=user)
-            ).select_related('course')
+            visible |= Q(course__isnull=True, created_by=user)
+        queryset = Dataset.objects.filter(visible)
 
         if database_type:
             queryset = queryset.filter(database_type=database_type)
 
-        datasets = []
-        for dataset in queryset:
-            datasets.append({
-                'id': str(dataset.id),
-                'name': dataset.name,
-                'description': dataset.description,
-                'course_title': dataset.course.title if dataset.course else None,
-                'database_type': dataset.database_type,
-                'schema_sql': dataset.schema_sql,
-                'seed_sql': dataset.seed_sql,
-                'quick_start_queries': dataset.quick_start_queries or {},
-            })
+        # Plain dict rows: no model instances, and only the course title
+        # is pulled through the join
+        rows = queryset.values(
+            'id', 'name', 'description', 'course__title', 'database_type',
+            'schema_sql', 'seed_sql', 'quick_start_queries',
+        )
+        datasets = [
+            {
+                'id': str(row['id']),
+                'name': row['name'],
+                'description': row['description'],
+                'course_title': row['course__title'],
+                'database_type': row['database_type'],
+                'schema_sql': row['schema_sql'],
+                'seed_sql': row['seed_sql'],
+                'quick_start_queries': row['quick_start_queries'] or {},
+            }
+            for row in rows
+        ]
 
         return Response(datasets)
 
@@ -208,19 +261,29 @@ class PoolHealthView(APIView):
 
     def get(self, request):
         """Check pool health and database availability."""
+        payload, status_code = _memoized_payload(
+            request, _HEALTH_PROBE, self._compute_health,
+        )
+        return Response(payload, status=status_code)
+
+    @staticmethod
+    def _compute_health() -> tuple[dict, int]:
         pool = get_sandbox_pool()
         stats = pool.get_stats()
 
         if not stats['running']:
-            return Response(
+            return (
                 {'status': 'unhealthy', 'reason': 'Pool not running'},
-                status=status.HTTP_503_SERVICE_UNAVAILABLE
+                status.HTTP_503_SERVICE_UNAVAILABLE,
             )
 
-        return Response({
-            'status': 'healthy',
-            'databases': stats['pools'],
-        })
+        return (
+            {
+                'status': 'healthy',
+                'databases': stats['pools'],
+            },
+            status.HTTP_200_OK,
+        )
 
 
 class PoolStatsView(APIView):
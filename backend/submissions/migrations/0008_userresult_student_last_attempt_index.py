@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submissions', '0007_submission_exercise'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userresult',
+            index=models.Index(fields=['student', '-last_attempt_at'], name='user_result_student_recent_idx'),
+        ),
+    ]
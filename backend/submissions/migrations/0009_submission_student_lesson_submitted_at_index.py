@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0011_lesson_exercises'),
+        ('submissions', '0008_userresult_student_last_attempt_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['student', 'lesson', '-submitted_at'], name='submissions_student_c6bf90_idx'),
+        ),
+        # Both are leading prefixes of a (..., -submitted_at) index
+        migrations.RemoveIndex(
+            model_name='submission',
+            name='submissions_student_707a68_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='submission',
+            name='submissions_student_937795_idx',
+        ),
+    ]
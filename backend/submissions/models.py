@@ -69,11 +69,11 @@ class Submission(models.Model):
         db_table = 'submissions'
         ordering = ['-submitted_at']
         indexes = [
-            models.Index(fields=['student', 'assignment']),
-            models.Index(fields=['student', 'lesson']),
             models.Index(fields=['assignment', 'is_correct']),
             models.Index(fields=['lesson', 'is_correct']),
+            # Also serve plain (student, assignment/lesson) lookups
             models.Index(fields=['student', 'assignment', '-submitted_at']),
+            models.Index(fields=['student', 'lesson', '-submitted_at']),
             models.Index(fields=['status']),
             models.Index(fields=['student', '-submitted_at']),
         ]
@@ -133,6 +133,8 @@ class UserResult(models.Model):
             models.Index(fields=['student', 'assignment']),
             models.Index(fields=['student', 'lesson']),
             models.Index(fields=['student', 'exercise']),
+            # Per-student listings in default (most recent first) order
+            models.Index(fields=['student', '-last_attempt_at'], name='user_result_student_recent_idx'),
         ]
         constraints = [
             models.UniqueConstraint(
@@ -157,21 +159,34 @@ class UserResult(models.Model):
         return f'{self.student.email} - {target}: {self.best_score}'
 
     def update_from_submission(self, submission):
-        """Update result based on a new submission (atomic)."""
-        from django.db.models import F
+        """Update result based on a new submission (atomic).
+
+        Every comparison happens in the UPDATE itself against the row's
+        current values, so concurrent submissions never lose an update.
+        The attempt itself is counted when the submission is accepted.
+        Returns the number of rows updated; ``self`` is not refreshed.
+        """
+        from django.db.models import Case, F, Value, When
+        from django.db.models.functions import Coalesce, Greatest
 
         update_fields = {
-            'total_attempts': F('total_attempts') + 1,
             'last_attempt_at': submission.submitted_at,
         }
 
-        if submission.score and (submission.score > self.best_score):
-            update_fields['best_score'] = submission.score
-            update_fields['best_submission'] = submission
-
-        if submission.is_correct and not self.is_completed:
+        if submission.score:
+            # Pin output fields: the grader may hand back a float score
+            score = Value(submission.score, output_field=self._meta.get_field('best_score'))
+            update_fields['best_score'] = Greatest('best_score', score)
+            update_fields['best_submission'] = Case(
+                When(best_score__lt=score, then=Value(submission.pk)),
+                default=F('best_submission'),
+                output_field=models.UUIDField(),
+            )
+
+        if submission.is_correct:
             update_fields['is_completed'] = True
-            update_fields['first_completed_at'] = submission.submitted_at
+            update_fields['first_completed_at'] = Coalesce(
+                'first_completed_at', Value(submission.submitted_at),
+            )
 
-        UserResult.objects.filter(pk=self.pk).update(**update_fields)
-        self.refresh_from_db()
+        return UserResult.objects.filter(pk=self.pk).update(**update_fields)
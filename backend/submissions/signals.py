@@ -0,0 +1,25 @@
+"""Cache invalidation for per-course progress totals."""
+
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from assignments.models import Assignment
+from courses.models import Lesson
+
+COURSE_TOTALS_CACHE_TTL = 3600  # seconds; invalidation below is the main path
+
+
+def course_totals_cache_key(course_id) -> str:
+    """Cache key for a course's published assignment/practice lesson counts."""
+    return f'course:{course_id}:totals'
+
+
+@receiver(post_save, sender=Assignment)
+@receiver(post_delete, sender=Assignment)
+@receiver(post_save, sender=Lesson)
+@receiver(post_delete, sender=Lesson)
+def invalidate_course_totals(sender, instance, **kwargs):
+    """Drop the cached totals of the course an assignment or lesson belongs to."""
+    if instance.course_id:
+        cache.delete(course_totals_cache_key(instance.course_id))
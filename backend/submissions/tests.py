@@ -1,3 +1,70 @@
+from datetime import timedelta
+from decimal import Decimal
+
 from django.test import TestCase
+from django.utils import timezone
+
+from users.models import User
+
+from .models import Submission, UserResult
+
+
+class UserResultUpdateTests(TestCase):
+
+    def setUp(self):
+        self.student = User.objects.create_user(email='student@example.com', password='x')
+        self.result = UserResult.objects.create(student=self.student)
+
+    def _submit(self, score, is_correct=False, minutes_ago=0):
+        submission = Submission.objects.create(
+            student=self.student,
+            query='SELECT 1',
+            status=Submission.Status.COMPLETED,
+            score=score,
+            is_correct=is_correct,
+        )
+        if minutes_ago:
+            # submitted_at is auto_now_add; backdate it to order attempts
+            submission.submitted_at = timezone.now() - timedelta(minutes=minutes_ago)
+            Submission.objects.filter(pk=submission.pk).update(submitted_at=submission.submitted_at)
+        self.assertEqual(self.result.update_from_submission(submission), 1)
+        self.result.refresh_from_db()
+        return submission
+
+    def test_first_attempt(self):
+        submission = self._submit(Decimal('60'))
+
+        self.assertEqual(self.result.best_score, Decimal('60'))
+        self.assertEqual(self.result.best_submission_id, submission.pk)
+        self.assertEqual(self.result.last_attempt_at, submission.submitted_at)
+        self.assertFalse(self.result.is_completed)
+        self.assertIsNone(self.result.first_completed_at)
+
+    def test_lower_score_keeps_best(self):
+        best = self._submit(Decimal('80'), minutes_ago=5)
+        later = self._submit(Decimal('50'))
+
+        self.assertEqual(self.result.best_score, Decimal('80'))
+        self.assertEqual(self.result.best_submission_id, best.pk)
+        self.assertEqual(self.result.last_attempt_at, later.submitted_at)
+
+    def test_higher_score_replaces_best(self):
+        self._submit(Decimal('50'), minutes_ago=5)
+        better = self._submit(Decimal('90'))
+
+        self.assertEqual(self.result.best_score, Decimal('90'))
+        self.assertEqual(self.result.best_submission_id, better.pk)
+
+    def test_completion_keeps_first_completed_at(self):
+        first = self._submit(Decimal('100'), is_correct=True, minutes_ago=10)
+        self._submit(Decimal('100'), is_correct=True, minutes_ago=5)
+        self._submit(Decimal('20'))
+
+        self.assertTrue(self.result.is_completed)
+        self.assertEqual(self.result.first_completed_at, first.submitted_at)
+        self.assertEqual(self.result.best_submission_id, first.pk)
+
+    def test_attempts_not_counted(self):
+        self._submit(Decimal('40'))
 
-# Create your tests here.
+        self.assertEqual(self.result.total_attempts, 0)
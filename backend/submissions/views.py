@@ -1,7 +1,13 @@
 """Views for submission handling with sandbox execution and grading."""
 
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
 from django.db import models, transaction
-from django.db.models import Count, Q
+from django.db.models import Count, Exists, F, Max, OuterRef, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.http import StreamingHttpResponse
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -11,6 +17,7 @@ from django.utils.decorators import method_decorator
 from django_ratelimit.decorators import ratelimit
 
 from .models import Submission, UserResult
+from .signals import COURSE_TOTALS_CACHE_TTL, course_totals_cache_key
 from .serializers import (
     SubmissionSerializer,
     SubmissionCreateSerializer,
@@ -18,27 +25,153 @@ from .serializers import (
     UserResultSerializer,
 )
 from assignments.models import Assignment
+from config.renderers import ORJSONRenderer
 from courses.models import Course, Enrollment, Lesson, LessonExercise
 from sandbox.services import execute_query
 from grading.models import get_grading_service
 
 
-def _get_course_stats(course_ids):
-    """Pre-fetch assignment/lesson counts per course to avoid N+1 queries."""
-    courses = Course.objects.filter(id__in=course_ids).annotate(
-        total_assignments=Count('assignments', filter=Q(assignments__is_published=True)),
-        total_practice_lessons=Count(
-            'lessons',
-            filter=Q(lessons__is_published=True, lessons__lesson_type__in=['practice', 'mixed'])
-        ),
+# Expected-query results are deterministic for a given database type,
+# dataset and query text, so they are computed once and shared
+EXPECTED_RESULT_CACHE_TTL = 3600  # seconds
+
+
+# Columns create() reads from an Assignment or LessonExercise to grade;
+# the fetches load only these (plus their own) to skip wide text fields
+GRADING_FIELDS = (
+    'expected_query', 'expected_result', 'required_keywords',
+    'forbidden_keywords', 'order_matters', 'max_score',
+)
+
+
+def _canonical_query(query):
+    """Query text without surrounding whitespace and trailing semicolons.
+
+    Deliberately no case or inner-whitespace folding: either can change
+    the meaning of string literals.
+    """
+    return query.strip().rstrip(';').rstrip()
+
+
+def _expected_result_cache_key(database_type, schema_sql, seed_sql, query):
+    """Cache key covering everything that determines an expected result."""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (database_type, schema_sql, seed_sql, query):
+        digest.update(part.encode())
+        digest.update(b'\0')
+    return f'submissions:expected-result:{digest.hexdigest()}'
+
+
+def _progress_by_course(results):
+    """Summarize a UserResult queryset per course, aggregated in SQL.
+
+    Courses are listed most recently attempted first.
+    """
+    rows = list(
+        results.annotate(
+            course_id=Coalesce('assignment__course_id', 'lesson__course_id'),
+            course_title=Coalesce('assignment__course__title', 'lesson__course__title'),
+        )
+        .filter(course_id__isnull=False)
+        .values('course_id', 'course_title')
+        .annotate(
+            completed=Count('id', filter=Q(is_completed=True)),
+            total_score=Sum('best_score'),
+            max_possible=Sum(
+                Coalesce('assignment__max_score', 'exercise__max_score', Value(0))
+            ),
+            last_attempt=Max('last_attempt_at'),
+        )
+        .order_by(F('last_attempt').desc(nulls_last=True))
     )
-    return {
-        c.id: {
-            'total_assignments': c.total_assignments,
-            'total_practice_lessons': c.total_practice_lessons,
+    course_stats = _get_course_stats([row['course_id'] for row in rows])
+
+    progress = []
+    for row in rows:
+        stats = course_stats.get(row['course_id'], {})
+        total = stats.get('total_assignments', 0) + stats.get('total_practice_lessons', 0)
+        total_score = float(row['total_score'] or 0)
+        max_possible = row['max_possible'] or 0
+        progress.append({
+            'course_id': str(row['course_id']),
+            'course_title': row['course_title'],
+            'total_assignments': total,
+            'completed_assignments': row['completed'],
+            'total_score': total_score,
+            'max_possible_score': max_possible,
+            'completion_rate': (
+                round(row['completed'] / total * 100, 2) if total > 0 else 0
+            ),
+            'percentage_score': (
+                round(total_score / max_possible * 100, 2) if max_possible > 0 else 0
+            ),
+        })
+    return progress
+
+
+# Rows fetched per server-side cursor round-trip when streaming a list
+STREAM_CHUNK_SIZE = 500
+
+
+def _stream_json_list(items):
+    """Yield a JSON array one encoded item at a time."""
+    renderer = ORJSONRenderer()
+    yield b'['
+    for index, item in enumerate(items):
+        if index:
+            yield b','
+        yield renderer.render(item)
+    yield b']'
+
+
+def _stored_result(result):
+    """Trim a result dict's rows to SUBMISSION_STORED_RESULT_ROWS for persisting.
+
+    Grading sees the full result. A trimmed copy is marked ``truncated``,
+    and ``total_rows`` records how many rows the query returned.
+    """
+    limit = settings.SUBMISSION_STORED_RESULT_ROWS
+    rows = result.get('rows')
+    if not rows or len(rows) <= limit:
+        return result
+    return {**result, 'rows': rows[:limit], 'truncated': True, 'total_rows': len(rows)}
+
+
+def _get_course_stats(course_ids):
+    """Assignment/lesson counts per course, cached per course.
+
+    Missing courses are counted in one query; the cache entries are
+    dropped whenever an assignment or lesson is saved or deleted.
+    """
+    keys = {course_totals_cache_key(course_id): course_id for course_id in course_ids}
+    stats = {keys[key]: value for key, value in cache.get_many(keys).items()}
+
+    missing = [course_id for course_id in keys.values() if course_id not in stats]
+    if missing:
+        courses = Course.objects.filter(id__in=missing).annotate(
+            # distinct: the two joins multiply each other's rows
+            total_assignments=Count(
+                'assignments', filter=Q(assignments__is_published=True), distinct=True,
+            ),
+            total_practice_lessons=Count(
+                'lessons',
+                filter=Q(lessons__is_published=True, lessons__lesson_type__in=['practice', 'mixed']),
+                distinct=True,
+            ),
+        )
+        computed = {
+            c.id: {
+                'total_assignments': c.total_assignments,
+                'total_practice_lessons': c.total_practice_lessons,
+            }
+            for c in courses
         }
-        for c in courses
-    }
+        cache.set_many(
+            {course_totals_cache_key(course_id): value for course_id, value in computed.items()},
+            COURSE_TOTALS_CACHE_TTL,
+        )
+        stats.update(computed)
+    return stats
 
 
 class SubmissionViewSet(viewsets.ModelViewSet):
@@ -52,9 +185,8 @@ class SubmissionViewSet(viewsets.ModelViewSet):
 
         if user.is_instructor:
             queryset = Submission.objects.filter(
-                assignment__course__instructor=user
-            ) | Submission.objects.filter(
-                lesson__course__instructor=user
+                Q(assignment__course__instructor=user)
+                | Q(lesson__course__instructor=user)
             )
         else:
             queryset = Submission.objects.filter(student=user)
@@ -86,17 +218,28 @@ class SubmissionViewSet(viewsets.ModelViewSet):
         exercise = None
         course = None
 
+        # Enrollment check rides along with the assignment/lesson fetch
+        enrolled = Exists(Enrollment.objects.filter(
+            course=OuterRef('course'), student=request.user, status='active',
+        ))
+
         if assignment_id:
             try:
                 assignment = Assignment.objects.select_related(
                     'course', 'dataset'
-                ).get(id=assignment_id)
+                ).only(
+                    'course', 'course__id', 'course__database_type',
+                    'dataset', 'dataset__id', 'dataset__schema_sql', 'dataset__seed_sql',
+                    *GRADING_FIELDS, 'partial_match', 'is_published',
+                    'max_attempts', 'time_limit_seconds',
+                ).annotate(is_enrolled=enrolled).get(id=assignment_id)
             except Assignment.DoesNotExist:
                 return Response(
                     {'detail': 'Assignment not found'},
                     status=status.HTTP_404_NOT_FOUND
                 )
             course = assignment.course
+            is_enrolled = assignment.is_enrolled
             max_attempts = assignment.max_attempts
             is_published = assignment.is_published
             dataset = assignment.dataset
@@ -111,7 +254,12 @@ class SubmissionViewSet(viewsets.ModelViewSet):
 
         elif lesson_id:
             try:
-                lesson = Lesson.objects.select_related('course').get(id=lesson_id)
+                lesson = Lesson.objects.select_related('course').only(
+                    'course', 'course__id', 'course__database_type', 'lesson_type',
+                    'is_published', 'max_attempts', 'time_limit_seconds',
+                ).annotate(
+                    is_enrolled=enrolled
+                ).get(id=lesson_id)
             except Lesson.DoesNotExist:
                 return Response(
                     {'detail': 'Lesson not found'},
@@ -129,7 +277,10 @@ class SubmissionViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             try:
-                exercise = LessonExercise.objects.select_related('dataset').get(
+                exercise = LessonExercise.objects.select_related('dataset').only(
+                    'dataset', 'dataset__id', 'dataset__schema_sql', 'dataset__seed_sql',
+                    *GRADING_FIELDS,
+                ).get(
                     id=exercise_id, lesson=lesson
                 )
             except LessonExercise.DoesNotExist:
@@ -138,6 +289,7 @@ class SubmissionViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_404_NOT_FOUND
                 )
             course = lesson.course
+            is_enrolled = lesson.is_enrolled
             max_attempts = lesson.max_attempts
             is_published = lesson.is_published
             dataset = exercise.dataset
@@ -164,9 +316,7 @@ class SubmissionViewSet(viewsets.ModelViewSet):
             )
 
         # Check enrollment
-        if not course.enrollments.filter(
-            student=request.user, status='active'
-        ).exists():
+        if not is_enrolled:
             return Response(
                 {'detail': 'Not enrolled in this course'},
                 status=status.HTTP_403_FORBIDDEN
@@ -198,12 +348,18 @@ class SubmissionViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
+            # Count the attempt while the row is locked, so concurrent
+            # submits cannot both slip under max_attempts
+            UserResult.objects.filter(pk=user_result.pk).update(
+                total_attempts=F('total_attempts') + 1
+            )
             attempt_number = user_result.total_attempts + 1
 
         student_query = serializer.validated_data['query']
 
-        # Create submission with running status
-        submission = Submission.objects.create(
+        # Build the submission now but insert it once, graded. Its id is
+        # assigned up front so the execution log can reference it.
+        submission = Submission(
             student=request.user,
             assignment=assignment,
             lesson=lesson,
@@ -244,16 +400,30 @@ class SubmissionViewSet(viewsets.ModelViewSet):
             grading_service = get_grading_service()
 
             # Execute expected query to get expected result if not stored
+            if (
+                expected_query and not expected_result
+                and submission.status == Submission.Status.COMPLETED
+                and _canonical_query(student_query) == _canonical_query(expected_query)
+            ):
+                # Same query on the same dataset: the student's result is
+                # the expected one, no second sandbox run needed
+                expected_result = submission.result
             if expected_query and not expected_result:
-                expected_response = execute_query(
-                    database_type=course.database_type,
-                    query=expected_query,
-                    schema_sql=schema_sql,
-                    seed_sql=seed_sql,
-                    timeout=time_limit,
+                cache_key = _expected_result_cache_key(
+                    course.database_type, schema_sql, seed_sql, expected_query,
                 )
-                if expected_response.success and expected_response.result:
-                    expected_result = expected_response.result.to_dict()
+                expected_result = cache.get(cache_key)
+                if expected_result is None:
+                    expected_response = execute_query(
+                        database_type=course.database_type,
+                        query=expected_query,
+                        schema_sql=schema_sql,
+                        seed_sql=seed_sql,
+                        timeout=time_limit,
+                    )
+                    if expected_response.success and expected_response.result:
+                        expected_result = expected_response.result.to_dict()
+                        cache.set(cache_key, expected_result, EXPECTED_RESULT_CACHE_TTL)
 
             grading_result = grading_service.grade(
                 student_result=submission.result or {},
@@ -271,19 +441,16 @@ class SubmissionViewSet(viewsets.ModelViewSet):
             submission.is_correct = grading_result.is_correct
             submission.feedback = grading_result.feedback
             submission.graded_at = timezone.now()
-            submission.save()
+            if submission.result:
+                submission.result = _stored_result(submission.result)
         except Exception as e:
             submission.status = Submission.Status.ERROR
             submission.error_message = f'Grading failed: {e}'
-            submission.save()
-            user_result.update_from_submission(submission)
-            return Response(
-                SubmissionResultSerializer(submission).data,
-                status=status.HTTP_201_CREATED
-            )
 
-        # Update user result
-        user_result.update_from_submission(submission)
+        # Persist the graded submission and its user result together
+        with transaction.atomic():
+            submission.save(force_insert=True)
+            user_result.update_from_submission(submission)
 
         result_serializer = SubmissionResultSerializer(submission)
         return Response(result_serializer.data, status=status.HTTP_201_CREATED)
@@ -305,8 +472,15 @@ class SubmissionViewSet(viewsets.ModelViewSet):
             'student', 'assignment', 'lesson'
         ).order_by('-submitted_at')
 
-        serializer = SubmissionSerializer(submissions, many=True)
-        return Response(serializer.data)
+        # Every submission carries its stored result, so stream the list
+        # in chunks rather than building it all in memory first
+        return StreamingHttpResponse(
+            _stream_json_list(
+                SubmissionSerializer(submission).data
+                for submission in submissions.iterator(chunk_size=STREAM_CHUNK_SIZE)
+            ),
+            content_type='application/json',
+        )
 
 
 class UserResultViewSet(viewsets.ReadOnlyModelViewSet):
@@ -321,9 +495,8 @@ class UserResultViewSet(viewsets.ReadOnlyModelViewSet):
 
         if user.is_instructor:
             queryset = UserResult.objects.filter(
-                assignment__course__instructor=user
-            ) | UserResult.objects.filter(
-                lesson__course__instructor=user
+                Q(assignment__course__instructor=user)
+                | Q(lesson__course__instructor=user)
             )
         else:
             queryset = UserResult.objects.filter(student=user)
@@ -334,9 +507,8 @@ class UserResultViewSet(viewsets.ReadOnlyModelViewSet):
             queryset = queryset.filter(lesson_id=lesson_id)
         if course_id:
             queryset = queryset.filter(
-                assignment__course_id=course_id
-            ) | queryset.filter(
-                lesson__course_id=course_id
+                Q(assignment__course_id=course_id)
+                | Q(lesson__course_id=course_id)
             )
 
         return queryset.select_related('student', 'assignment', 'lesson', 'best_submission')
@@ -344,73 +516,8 @@ class UserResultViewSet(viewsets.ReadOnlyModelViewSet):
     @action(detail=False, methods=['get'])
     def my_progress(self, request):
         """Get current user's progress across all enrolled courses."""
-        results = UserResult.objects.filter(
-            student=request.user
-        ).select_related('assignment__course', 'lesson__course')[:5000]
-
-        # Collect course IDs first, then pre-fetch stats in one query
-        course_ids = set()
-        result_list = list(results)
-        for result in result_list:
-            if result.assignment and result.assignment.course:
-                course_ids.add(result.assignment.course.id)
-            elif result.lesson and result.lesson.course:
-                course_ids.add(result.lesson.course.id)
-
-        course_stats = _get_course_stats(course_ids)
-
-        courses_data = {}
-        for result in result_list:
-            course = None
-            if result.assignment:
-                course = result.assignment.course
-            elif result.lesson:
-                course = result.lesson.course
-
-            if not course:
-                continue
-
-            if course.id not in courses_data:
-                stats = course_stats.get(course.id, {})
-                total = stats.get('total_assignments', 0) + stats.get('total_practice_lessons', 0)
-
-                courses_data[course.id] = {
-                    'course_id': str(course.id),
-                    'course_title': course.title,
-                    'total_assignments': total,
-                    'completed_assignments': 0,
-                    'total_score': 0,
-                    'max_possible_score': 0,
-                }
-
-            if result.assignment:
-                max_score = result.assignment.max_score
-            elif result.exercise:
-                max_score = result.exercise.max_score
-            else:
-                max_score = 0
-
-            courses_data[course.id]['max_possible_score'] += max_score
-            if result.is_completed:
-                courses_data[course.id]['completed_assignments'] += 1
-            courses_data[course.id]['total_score'] += float(result.best_score)
-
-        for data in courses_data.values():
-            if data['total_assignments'] > 0:
-                data['completion_rate'] = round(
-                    data['completed_assignments'] / data['total_assignments'] * 100, 2
-                )
-            else:
-                data['completion_rate'] = 0
-
-            if data['max_possible_score'] > 0:
-                data['percentage_score'] = round(
-                    data['total_score'] / data['max_possible_score'] * 100, 2
-                )
-            else:
-                data['percentage_score'] = 0
-
-        return Response(list(courses_data.values()))
+        results = UserResult.objects.filter(student=request.user)
+        return Response(_progress_by_course(results))
 
     @action(detail=False, methods=['get'])
     def student_progress(self, request):
@@ -439,73 +546,8 @@ class UserResultViewSet(viewsets.ReadOnlyModelViewSet):
             )
 
         # Only show progress for courses this instructor owns
-        results = UserResult.objects.filter(
-            student=student
-        ).select_related('assignment__course', 'lesson__course').filter(
+        results = UserResult.objects.filter(student=student).filter(
             models.Q(assignment__course__instructor=request.user) |
             models.Q(lesson__course__instructor=request.user)
-        )[:5000]
-
-        # Pre-fetch course stats to avoid N+1
-        course_ids = set()
-        result_list = list(results)
-        for result in result_list:
-            if result.assignment and result.assignment.course:
-                course_ids.add(result.assignment.course.id)
-            elif result.lesson and result.lesson.course:
-                course_ids.add(result.lesson.course.id)
-
-        course_stats = _get_course_stats(course_ids)
-
-        courses_data = {}
-        for result in result_list:
-            course = None
-            if result.assignment:
-                course = result.assignment.course
-            elif result.lesson:
-                course = result.lesson.course
-
-            if not course:
-                continue
-
-            if course.id not in courses_data:
-                stats = course_stats.get(course.id, {})
-                total = stats.get('total_assignments', 0) + stats.get('total_practice_lessons', 0)
-
-                courses_data[course.id] = {
-                    'course_id': str(course.id),
-                    'course_title': course.title,
-                    'total_assignments': total,
-                    'completed_assignments': 0,
-                    'total_score': 0,
-                    'max_possible_score': 0,
-                }
-
-            if result.assignment:
-                max_score = result.assignment.max_score
-            elif result.exercise:
-                max_score = result.exercise.max_score
-            else:
-                max_score = 0
-
-            courses_data[course.id]['max_possible_score'] += max_score
-            if result.is_completed:
-                courses_data[course.id]['completed_assignments'] += 1
-            courses_data[course.id]['total_score'] += float(result.best_score)
-
-        for data in courses_data.values():
-            if data['total_assignments'] > 0:
-                data['completion_rate'] = round(
-                    data['completed_assignments'] / data['total_assignments'] * 100, 2
-                )
-            else:
-                data['completion_rate'] = 0
-
-            if data['max_possible_score'] > 0:
-                data['percentage_score'] = round(
-                    data['total_score'] / data['max_possible_score'] * 100, 2
-                )
-            else:
-                data['percentage_score'] = 0
-
-        return Response(list(courses_data.values()))
+        )
+        return Response(_progress_by_course(results))
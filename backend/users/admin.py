@@ -30,4 +30,5 @@ class InviteAdmin(admin.ModelAdmin):
     list_display = ('email', 'role', 'course', 'invited_by', 'is_used', 'expires_at')
     list_filter = ('role', 'is_used')
     search_fields = ('email',)
-    raw_id_fields = ('invited_by', 'course')
+    autocomplete_fields = ('invited_by', 'course')
+    list_select_related = ('course', 'invited_by')
@@ -0,0 +1,24 @@
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_user_email_trgm_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=['first_name'], name='users_first_name_trgm_idx', opclasses=['gin_trgm_ops'],
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=['last_name'], name='users_last_name_trgm_idx', opclasses=['gin_trgm_ops'],
+            ),
+        ),
+    ]
@@ -1,5 +1,6 @@
 import uuid
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 
 
@@ -32,6 +33,8 @@ class User(AbstractBaseUser, PermissionsMixin):
         INSTRUCTOR = 'instructor', 'Instructor'
         ADMIN = 'admin', 'Admin'
 
+    _INSTRUCTOR_ROLES = frozenset((Role.INSTRUCTOR, Role.ADMIN))
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     email = models.EmailField(unique=True)
     first_name = models.CharField(max_length=150, blank=True)
@@ -56,6 +59,14 @@ class User(AbstractBaseUser, PermissionsMixin):
     class Meta:
         db_table = 'users'
         ordering = ['-created_at']
+        indexes = [
+            # Trigram index so admin searches (ILIKE '%term%') avoid a full scan
+            GinIndex(fields=['email'], name='users_email_trgm_idx', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['first_name'], name='users_first_name_trgm_idx', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['last_name'], name='users_last_name_trgm_idx', opclasses=['gin_trgm_ops']),
+            # Keyset pagination of the admin user list
+            models.Index(fields=['-created_at', '-id'], name='users_created_id_idx'),
+        ]
 
     def __str__(self):
         return self.email
@@ -66,7 +77,7 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     @property
     def is_instructor(self):
-        return self.role in [self.Role.INSTRUCTOR, self.Role.ADMIN]
+        return self.role in self._INSTRUCTOR_ROLES
 
     @property
     def is_student(self):
@@ -101,6 +112,10 @@ class Invite(models.Model):
     class Meta:
         db_table = 'invites'
         ordering = ['-created_at']
+        # token lookups are already served by its unique index
+        indexes = [
+            models.Index(fields=['email'], name='invites_email_idx'),
+        ]
 
     def __str__(self):
         return f'Invite for {self.email}'
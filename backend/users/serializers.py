@@ -5,30 +5,41 @@ from django.contrib.auth.password_validation import validate_password
 User = get_user_model()
 
 
-class UserSerializer(serializers.ModelSerializer):
+class AvatarUrlMixin:
+    """Append an absolute ``avatar_url``, resolving scheme and host once per serializer."""
+
+    _absolute_base = None
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        data['avatar_url'] = self.get_avatar_url(instance) if instance.avatar else None
+        return data
+
+    def get_avatar_url(self, obj):
+        url = obj.avatar.url
+        request = self.context.get('request')
+        if not request or not url.startswith('/'):
+            return request.build_absolute_uri(url) if request else url
+        if self._absolute_base is None:
+            self._absolute_base = request.build_absolute_uri('/')[:-1]
+        return self._absolute_base + url
+
+
+class UserSerializer(AvatarUrlMixin, serializers.ModelSerializer):
     full_name = serializers.ReadOnlyField()
-    avatar_url = serializers.SerializerMethodField()
 
     class Meta:
         model = User
         fields = [
             'id', 'email', 'first_name', 'last_name', 'full_name',
             'role', 'must_change_password', 'is_active', 'created_at',
-            'avatar', 'avatar_url'
+            'avatar',
         ]
-        read_only_fields = ['id', 'email', 'role', 'is_active', 'created_at', 'avatar_url']
+        read_only_fields = ['id', 'email', 'role', 'is_active', 'created_at']
         extra_kwargs = {
             'avatar': {'write_only': True},
         }
 
-    def get_avatar_url(self, obj):
-        if obj.avatar:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.avatar.url)
-            return obj.avatar.url
-        return None
-
 
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, validators=[validate_password])
@@ -108,22 +119,13 @@ class AdminCreateUserSerializer(serializers.Serializer):
         return value
 
 
-class AdminUserListSerializer(serializers.ModelSerializer):
+class AdminUserListSerializer(AvatarUrlMixin, serializers.ModelSerializer):
     full_name = serializers.ReadOnlyField()
-    avatar_url = serializers.SerializerMethodField()
 
     class Meta:
         model = User
         fields = [
             'id', 'email', 'first_name', 'last_name', 'full_name',
             'role', 'must_change_password', 'is_active', 'created_at',
-            'avatar_url',
         ]
 
-    def get_avatar_url(self, obj):
-        if obj.avatar:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.avatar.url)
-            return obj.avatar.url
-        return None
@@ -1,3 +1,179 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+import threading
+from datetime import timedelta
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from .models import Invite, User
+
+PASSWORD = 'Corr3ct-horse-battery'
+
+
+def _make_invite(inviter, email='invitee@example.com', expires_in=timedelta(days=1), **kwargs):
+    return Invite.objects.create(
+        email=email,
+        invited_by=inviter,
+        token=f'token-{email}',
+        expires_at=timezone.now() + expires_in,
+        **kwargs,
+    )
+
+
+def _accept_payload(invite):
+    return {
+        'token': invite.token,
+        'password': PASSWORD,
+        'password_confirm': PASSWORD,
+        'first_name': 'Ada',
+    }
+
+
+@override_settings(RATELIMIT_ENABLE=False)
+class InviteAcceptTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('invite_accept')
+        self.admin = User.objects.create_user(
+            email='admin@example.com', password=PASSWORD, role=User.Role.ADMIN,
+        )
+
+    def test_accept_creates_user_and_claims_invite(self):
+        invite = _make_invite(self.admin)
+
+        response = self.client.post(self.url, _accept_payload(invite), format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertIn('tokens', response.data)
+        user = User.objects.get(email=invite.email)
+        self.assertEqual(user.first_name, 'Ada')
+        invite.refresh_from_db()
+        self.assertTrue(invite.is_used)
+
+    def test_expired_token_rejected(self):
+        invite = _make_invite(self.admin, expires_in=-timedelta(minutes=1))
+
+        response = self.client.post(self.url, _accept_payload(invite), format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['detail'], 'Invalid or expired invitation')
+        self.assertFalse(User.objects.filter(email=invite.email).exists())
+
+    def test_reused_token_rejected(self):
+        invite = _make_invite(self.admin)
+        first = self.client.post(self.url, _accept_payload(invite), format='json')
+        second = self.client.post(self.url, _accept_payload(invite), format='json')
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.status_code, 400)
+        self.assertEqual(second.data['detail'], 'Invalid or expired invitation')
+        self.assertEqual(User.objects.filter(email=invite.email).count(), 1)
+
+    def test_existing_email_rolls_back_claim(self):
+        User.objects.create_user(email='taken@example.com', password=PASSWORD)
+        invite = _make_invite(self.admin, email='taken@example.com')
+
+        response = self.client.post(self.url, _accept_payload(invite), format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['detail'], 'User with this email already exists')
+        invite.refresh_from_db()
+        self.assertFalse(invite.is_used)
+
+
+@override_settings(RATELIMIT_ENABLE=False)
+class InviteAcceptConcurrencyTests(TransactionTestCase):
+    """Runs outside a wrapping transaction so each thread commits on its own."""
+
+    def test_concurrent_accepts_create_one_user(self):
+        admin = User.objects.create_user(
+            email='admin@example.com', password=PASSWORD, role=User.Role.ADMIN,
+        )
+        invite = _make_invite(admin)
+        payload = _accept_payload(invite)
+        url = reverse('invite_accept')
+        barrier = threading.Barrier(2)
+        statuses = []
+
+        def accept():
+            try:
+                barrier.wait()
+                statuses.append(APIClient().post(url, payload, format='json').status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=accept) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(statuses), [201, 400])
+        self.assertEqual(User.objects.filter(email=invite.email).count(), 1)
+
+
+class MeViewETagTests(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.user = User.objects.create_user(email='me@example.com', password=PASSWORD)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('me')
+
+    def _etag(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def _refresh_user(self):
+        self.user.refresh_from_db()
+        self.client.force_authenticate(self.user)
+
+    def test_matching_if_none_match_returns_304(self):
+        etag = self._etag()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertFalse(response.content)
+
+    def test_stale_if_none_match_returns_body(self):
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH='W/"stale"')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['email'], self.user.email)
+
+    def test_etag_changes_after_patch(self):
+        etag = self._etag()
+
+        response = self.client.patch(self.url, {'first_name': 'Grace'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self._refresh_user()
+
+        self.assertNotEqual(self._etag(), etag)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_etag_changes_after_avatar_update(self):
+        etag = self._etag()
+        buffer = io.BytesIO()
+        Image.new('RGB', (32, 32), 'red').save(buffer, 'PNG')
+        avatar = SimpleUploadedFile('avatar.png', buffer.getvalue(), content_type='image/png')
+
+        with self.settings(MEDIA_ROOT=self.media_root):
+            response = self.client.patch(self.url, {'avatar': avatar}, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        self._refresh_user()
+
+        self.assertTrue(self.user.avatar)
+        self.assertNotEqual(self._etag(), etag)
@@ -1,20 +1,27 @@
+import io
+import logging
+import os
 import string
 import secrets
 
 from django.contrib.auth import get_user_model
-from django.db import transaction
+from django.core.files.base import ContentFile
+from django.db import IntegrityError, connection, transaction
 from django.db.models import Q
 from django.utils import timezone
+from django.utils.cache import patch_vary_headers
 from django.utils.decorators import method_decorator
+from django.utils.http import http_date, parse_etags
 from django_ratelimit.decorators import ratelimit
 from rest_framework import status, generics
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.pagination import CursorPagination
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.exceptions import TokenError
-from PIL import Image
+from PIL import Image, ImageFile, ImageOps
 
 from .models import Invite
 from .serializers import (
@@ -27,10 +34,32 @@ from .serializers import (
     AdminCreateUserSerializer,
     AdminUserListSerializer,
 )
+from config.permissions import IsAdmin
 from courses.models import Course, Enrollment
 
+logger = logging.getLogger(__name__)
+
 User = get_user_model()
 
+# Admin-created accounts get a password the admin can read out or paste
+GENERATED_PASSWORD_ALPHABET = string.ascii_letters + string.digits
+GENERATED_PASSWORD_LENGTH = 10
+
+# Columns the credential check and UserSerializer read on login
+LOGIN_USER_FIELDS = (
+    'id', 'email', 'password', 'first_name', 'last_name', 'role',
+    'must_change_password', 'is_active', 'created_at', 'avatar',
+)
+
+
+def _issue_tokens(user):
+    """Sign a refresh token and its access token for ``user``."""
+    refresh = RefreshToken.for_user(user)
+    return {
+        'refresh': str(refresh),
+        'access': str(refresh.access_token),
+    }
+
 
 class RegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
@@ -43,13 +72,9 @@ class RegisterView(generics.CreateAPIView):
         serializer.is_valid(raise_exception=True)
         user = serializer.save()
 
-        refresh = RefreshToken.for_user(user)
         return Response({
             'user': UserSerializer(user, context={'request': request}).data,
-            'tokens': {
-                'refresh': str(refresh),
-                'access': str(refresh.access_token),
-            }
+            'tokens': _issue_tokens(user),
         }, status=status.HTTP_201_CREATED)
 
 
@@ -65,8 +90,10 @@ class LoginView(APIView):
         password = serializer.validated_data['password']
 
         try:
-            user = User.objects.get(email=email)
+            user = User.objects.only(*LOGIN_USER_FIELDS).get(email=email)
         except User.DoesNotExist:
+            # Hash anyway so unknown emails take as long as wrong passwords
+            User().set_password(password)
             return Response(
                 {'detail': 'Invalid credentials'},
                 status=status.HTTP_401_UNAUTHORIZED
@@ -84,13 +111,9 @@ class LoginView(APIView):
                 status=status.HTTP_401_UNAUTHORIZED
             )
 
-        refresh = RefreshToken.for_user(user)
         return Response({
             'user': UserSerializer(user, context={'request': request}).data,
-            'tokens': {
-                'refresh': str(refresh),
-                'access': str(refresh.access_token),
-            }
+            'tokens': _issue_tokens(user),
         })
 
 
@@ -113,42 +136,100 @@ class MeView(APIView):
     permission_classes = [IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser, JSONParser]
 
-    ALLOWED_IMAGE_TYPES = ['image/jpeg', 'image/png', 'image/webp', 'image/gif']
+    ALLOWED_IMAGE_FORMATS = frozenset(('JPEG', 'PNG', 'WEBP', 'GIF'))
     MAX_AVATAR_SIZE = 2 * 1024 * 1024  # 2MB
+    AVATAR_SNIFF_CHUNK = 64 * 1024
+    AVATAR_MAX_DIMENSION = 256
+    AVATAR_WEBP_QUALITY = 82
 
     def get(self, request):
-        return Response(UserSerializer(request.user, context={'request': request}).data)
+        # updated_at moves on every save, so it versions the whole payload
+        user = request.user
+        etag = f'W/"{user.pk}-{user.updated_at.timestamp():.6f}"'
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(UserSerializer(user, context={'request': request}).data)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(user.updated_at.timestamp())
+        response['Cache-Control'] = 'private, no-cache'
+        patch_vary_headers(response, ('Authorization',))
+        return response
 
     def patch(self, request):
         avatar = request.FILES.get('avatar')
         if avatar:
-            if avatar.content_type not in self.ALLOWED_IMAGE_TYPES:
-                return Response(
-                    {'avatar': 'Only JPG, PNG, WebP, and GIF images are allowed.'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
             if avatar.size > self.MAX_AVATAR_SIZE:
                 return Response(
                     {'avatar': 'Image size must not exceed 2MB.'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
+            # The type is sniffed from the file header rather than taken from
+            # the client's Content-Type; the serializer's ImageField runs
+            # PIL's full verify() on the file afterwards. JPEG headers can
+            # sit behind large EXIF/ICC blocks, so keep feeding until the
+            # header parses or the (size-capped) file runs out.
             try:
-                img = Image.open(avatar)
-                img.verify()
-                avatar.seek(0)
+                parser = ImageFile.Parser()
+                while parser.image is None:
+                    chunk = avatar.read(self.AVATAR_SNIFF_CHUNK)
+                    if not chunk:
+                        break
+                    parser.feed(chunk)
+                header = parser.image
             except Exception:
+                header = None
+            finally:
+                avatar.seek(0)
+            image_format = header.format if header else None
+            if image_format is None:
                 return Response(
                     {'avatar': 'File is not a valid image.'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
+            if image_format not in self.ALLOWED_IMAGE_FORMATS:
+                return Response(
+                    {'avatar': 'Only JPG, PNG, WebP, and GIF images are allowed.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
 
         serializer = UserSerializer(
             request.user, data=request.data, partial=True, context={'request': request}
         )
         serializer.is_valid(raise_exception=True)
+        if avatar and max(header.size) > self.AVATAR_MAX_DIMENSION:
+            thumbnail = self._downscale_avatar(avatar)
+            if thumbnail is not None:
+                serializer.validated_data['avatar'] = thumbnail
         serializer.save()
         return Response(serializer.data)
 
+    def _downscale_avatar(self, avatar):
+        """Re-encode an oversized avatar as a WebP thumbnail, or None to keep it as is."""
+        size = (self.AVATAR_MAX_DIMENSION, self.AVATAR_MAX_DIMENSION)
+        try:
+            img = Image.open(avatar)
+            if getattr(img, 'is_animated', False):
+                return None
+            icc_profile = img.info.get('icc_profile')
+            # JPEG decodes straight at a reduced scale; other formats ignore this
+            img.draft('RGB', size)
+            # WebP output carries no EXIF, so bake the orientation in first
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail(size)
+            if img.mode not in ('RGB', 'RGBA'):
+                img = img.convert('RGBA')
+            buf = io.BytesIO()
+            save_kwargs = {'icc_profile': icc_profile} if icc_profile else {}
+            img.save(buf, format='WEBP', quality=self.AVATAR_WEBP_QUALITY, **save_kwargs)
+        except Exception:
+            logger.warning('Could not downscale avatar %s', avatar.name, exc_info=True)
+            return None
+        finally:
+            avatar.seek(0)
+        name = os.path.splitext(os.path.basename(avatar.name))[0] + '.webp'
+        return ContentFile(buf.getvalue(), name=name)
+
 
 class ChangePasswordView(APIView):
     permission_classes = [IsAuthenticated]
@@ -160,7 +241,7 @@ class ChangePasswordView(APIView):
 
         request.user.set_password(serializer.validated_data['new_password'])
         request.user.must_change_password = False
-        request.user.save()
+        request.user.save(update_fields=['password', 'must_change_password', 'updated_at'])
 
         return Response({'detail': 'Password changed successfully'})
 
@@ -187,7 +268,9 @@ class SetPasswordView(APIView):
         if serializer.validated_data.get('last_name'):
             user.last_name = serializer.validated_data['last_name']
         user.must_change_password = False
-        user.save()
+        user.save(update_fields=[
+            'password', 'first_name', 'last_name', 'must_change_password', 'updated_at',
+        ])
 
         return Response({'detail': 'Password set successfully'})
 
@@ -202,48 +285,46 @@ class InviteAcceptView(APIView):
 
         token = serializer.validated_data['token']
 
+        # Claiming the invite is one conditional UPDATE, so two concurrent
+        # accepts cannot both win it; a failed user insert rolls the claim
+        # back, and the unique constraint on email catches existing accounts
         try:
-            invite = Invite.objects.get(token=token, is_used=False)
-        except Invite.DoesNotExist:
-            return Response(
-                {'detail': 'Invalid or expired invitation'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        if invite.expires_at < timezone.now():
-            return Response(
-                {'detail': 'Invitation has expired'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    table = connection.ops.quote_name(Invite._meta.db_table)
+                    cursor.execute(
+                        f'UPDATE {table} SET is_used = TRUE '
+                        'WHERE token = %s AND is_used = FALSE AND expires_at >= %s '
+                        'RETURNING email, role, course_id',
+                        [token, timezone.now()],
+                    )
+                    claimed = cursor.fetchone()
+                if claimed is None:
+                    return Response(
+                        {'detail': 'Invalid or expired invitation'},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                email, role, course_id = claimed
+
+                user = User.objects.create_user(
+                    email=email,
+                    password=serializer.validated_data['password'],
+                    role=role,
+                    first_name=serializer.validated_data.get('first_name', ''),
+                    last_name=serializer.validated_data.get('last_name', ''),
+                )
 
-        if User.objects.filter(email=invite.email).exists():
+                if course_id:
+                    Enrollment.objects.create(student=user, course_id=course_id)
+        except IntegrityError:
             return Response(
                 {'detail': 'User with this email already exists'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        with transaction.atomic():
-            user = User.objects.create_user(
-                email=invite.email,
-                password=serializer.validated_data['password'],
-                role=invite.role,
-                first_name=serializer.validated_data.get('first_name', ''),
-                last_name=serializer.validated_data.get('last_name', ''),
-            )
-
-            invite.is_used = True
-            invite.save()
-
-            if invite.course:
-                Enrollment.objects.create(student=user, course=invite.course)
-
-        refresh = RefreshToken.for_user(user)
         return Response({
             'user': UserSerializer(user, context={'request': request}).data,
-            'tokens': {
-                'refresh': str(refresh),
-                'access': str(refresh.access_token),
-            }
+            'tokens': _issue_tokens(user),
         }, status=status.HTTP_201_CREATED)
 
 
@@ -252,45 +333,34 @@ class InviteCheckView(APIView):
     permission_classes = [AllowAny]
 
     def get(self, request, token):
-        try:
-            invite = Invite.objects.get(token=token, is_used=False)
-        except Invite.DoesNotExist:
+        invite = Invite.objects.filter(
+            token=token, is_used=False, expires_at__gte=timezone.now(),
+        ).values('email', 'role', 'course__title').first()
+        if invite is None:
             return Response(
-                {'valid': False, 'detail': 'Invalid invitation'},
+                {'valid': False, 'detail': 'Invalid or expired invitation'},
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        if invite.expires_at < timezone.now():
-            return Response(
-                {'valid': False, 'detail': 'Invitation has expired'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
         return Response({
             'valid': True,
-            'email': invite.email,
-            'role': invite.role,
-            'course': invite.course.title if invite.course else None,
+            'email': invite['email'],
+            'role': invite['role'],
+            'course': invite['course__title'],
         })
 
 
 class AdminCreateUserView(APIView):
     """Admin-only: create a new user with a random password."""
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, IsAdmin]
 
     def post(self, request):
-        if not request.user.is_superuser and request.user.role != 'admin':
-            return Response(
-                {'detail': 'Admin access required'},
-                status=status.HTTP_403_FORBIDDEN
-            )
-
         serializer = AdminCreateUserSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
         password = ''.join(
-            secrets.choice(string.ascii_letters + string.digits)
-            for _ in range(10)
+            secrets.choice(GENERATED_PASSWORD_ALPHABET)
+            for _ in range(GENERATED_PASSWORD_LENGTH)
         )
 
         course_id = serializer.validated_data.get('course_id')
@@ -328,18 +398,23 @@ class AdminCreateUserView(APIView):
         }, status=status.HTTP_201_CREATED)
 
 
+class AdminUserPagination(CursorPagination):
+    """Keyset pages over (created_at, id), so deep pages cost the same as the first."""
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+
+
 class AdminUsersListView(APIView):
     """Admin-only: list users with search/filter/pagination."""
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, IsAdmin]
 
     def get(self, request):
-        if not request.user.is_superuser and request.user.role != 'admin':
-            return Response(
-                {'detail': 'Admin access required'},
-                status=status.HTTP_403_FORBIDDEN
-            )
-
-        queryset = User.objects.all().order_by('-created_at')
+        queryset = User.objects.only(
+            'id', 'email', 'first_name', 'last_name', 'role',
+            'must_change_password', 'is_active', 'created_at', 'avatar',
+        )
 
         role = request.query_params.get('role')
         if role:
@@ -353,28 +428,13 @@ class AdminUsersListView(APIView):
                 Q(last_name__icontains=search)
             )
 
-        try:
-            page = max(1, int(request.query_params.get('page', 1)))
-            page_size = min(100, max(1, int(request.query_params.get('page_size', 20))))
-        except (ValueError, TypeError):
-            page = 1
-            page_size = 20
-        total = queryset.count()
-        start = (page - 1) * page_size
-        end = start + page_size
-        users = queryset[start:end]
-
-        next_url = None
-        previous_url = None
-        if end < total:
-            next_url = f'?page={page + 1}&page_size={page_size}'
-        if page > 1:
-            previous_url = f'?page={page - 1}&page_size={page_size}'
+        paginator = AdminUserPagination()
+        users = paginator.paginate_queryset(queryset, request, view=self)
 
         return Response({
-            'count': total,
-            'next': next_url,
-            'previous': previous_url,
+            'count': queryset.count(),
+            'next': paginator.get_next_link(),
+            'previous': paginator.get_previous_link(),
             'results': AdminUserListSerializer(
                 users, many=True, context={'request': request}
             ).data,
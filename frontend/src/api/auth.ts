@@ -1,5 +1,5 @@
 import apiClient from './client';
-import type { AuthResponse, User, PaginatedResponse } from '@/types';
+import type { AuthResponse, User, CursorPaginatedResponse } from '@/types';
 
 export interface LoginData {
   email: string;
@@ -123,10 +123,10 @@ export const adminApi = {
   listUsers: async (params?: {
     role?: string;
     search?: string;
-    page?: number;
+    cursor?: string;
     page_size?: number;
-  }): Promise<PaginatedResponse<User>> => {
-    const response = await apiClient.get<PaginatedResponse<User>>('/auth/admin/users/', { params });
+  }): Promise<CursorPaginatedResponse<User>> => {
+    const response = await apiClient.get<CursorPaginatedResponse<User>>('/auth/admin/users/', { params });
     return response.data;
   },
 };
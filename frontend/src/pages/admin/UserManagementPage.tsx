@@ -57,18 +57,19 @@ export function UserManagementPage() {
   const [searchQuery, setSearchQuery] = useState('');
   const [roleFilter, setRoleFilter] = useState<string>('all');
   const [page, setPage] = useState(1);
+  const [cursor, setCursor] = useState<string | null>(null);
   const pageSize = 20;
 
   const { data: coursesData } = useCourses();
   const courses = coursesData?.results ?? [];
 
   const usersQuery = useQuery({
-    queryKey: ['admin-users', roleFilter, searchQuery, page],
+    queryKey: ['admin-users', roleFilter, searchQuery, cursor],
     queryFn: () =>
       adminApi.listUsers({
         role: roleFilter === 'all' ? undefined : roleFilter,
         search: searchQuery || undefined,
-        page,
+        cursor: cursor ?? undefined,
         page_size: pageSize,
       }),
   });
@@ -131,8 +132,19 @@ export function UserManagementPage() {
 
   const users = usersQuery.data?.results ?? [];
   const totalCount = usersQuery.data?.count ?? 0;
-  const hasNext = !!usersQuery.data?.next;
-  const hasPrev = !!usersQuery.data?.previous;
+  const nextLink = usersQuery.data?.next ?? null;
+  const prevLink = usersQuery.data?.previous ?? null;
+  const hasNext = !!nextLink;
+  const hasPrev = !!prevLink;
+
+  // The API pages by opaque cursors embedded in its next/previous links
+  const cursorFrom = (link: string | null) =>
+    link ? new URL(link, window.location.origin).searchParams.get('cursor') : null;
+
+  const resetPagination = () => {
+    setPage(1);
+    setCursor(null);
+  };
 
   return (
     <div className="space-y-6 animate-fade-in">
@@ -233,7 +245,7 @@ export function UserManagementPage() {
                 value={searchQuery}
                 onChange={(e) => {
                   setSearchQuery(e.target.value);
-                  setPage(1);
+                  resetPagination();
                 }}
                 className="pl-9 h-10"
               />
@@ -245,7 +257,7 @@ export function UserManagementPage() {
             value={roleFilter}
             onValueChange={(v) => {
               setRoleFilter(v);
-              setPage(1);
+              resetPagination();
             }}
           >
             <TabsList>
@@ -328,12 +340,15 @@ export function UserManagementPage() {
           )}
 
           {/* Pagination */}
-          {totalCount > pageSize && (
+          {(hasNext || hasPrev) && (
             <div className="flex items-center justify-center gap-2 pt-2">
               <Button
                 variant="outline"
                 size="sm"
-                onClick={() => setPage((p) => p - 1)}
+                onClick={() => {
+                  setCursor(cursorFrom(prevLink));
+                  setPage((p) => p - 1);
+                }}
                 disabled={!hasPrev}
               >
                 <ChevronLeft className="h-4 w-4" />
@@ -344,7 +359,10 @@ export function UserManagementPage() {
               <Button
                 variant="outline"
                 size="sm"
-                onClick={() => setPage((p) => p + 1)}
+                onClick={() => {
+                  setCursor(cursorFrom(nextLink));
+                  setPage((p) => p + 1);
+                }}
                 disabled={!hasNext}
               >
                 <ChevronRight className="h-4 w-4" />
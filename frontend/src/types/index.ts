@@ -112,6 +112,9 @@ export interface QueryResult {
   columns: string[];
   rows: unknown[][];
   row_count: number;
+  // Set on stored submissions whose rows were trimmed for persistence
+  truncated?: boolean;
+  total_rows?: number;
 }
 
 export interface SubmissionFeedback {
@@ -170,3 +173,10 @@ export interface PaginatedResponse<T> {
   previous: string | null;
   results: T[];
 }
+
+export interface CursorPaginatedResponse<T> {
+  count: number;
+  next: string | null;
+  previous: string | null;
+  results: T[];
+}